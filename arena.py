@@ -0,0 +1,315 @@
+import random
+
+from engine import (SnakeEngine, SnakeBody, DIRECTIONS, DEFAULT_START, MOVE, FOOD, SPECIAL,
+                    DEATH, FOOD_POINTS, SPECIAL_POINTS, INVINCIBLE_MULTIPLIER)
+
+# Сколько еды лежит на поле на каждую змейку
+FOOD_PER_SNAKE = 0.5
+# Вероятность случайного безопасного хода бота, чтобы боты не ходили строем
+BOT_WANDER = 0.1
+# Из скольких случайных кусков еды бот выбирает ближайший
+BOT_CHOICES = 4
+# Сколько раз искать свободную клетку без еды, прежде чем отложить до следующего тика
+SPAWN_TRIES = 8
+# На сколько клеток вперед смотреть, выбирая направление новой змейки
+SPAWN_RUN = 5
+
+
+def player_attribute(name):
+    # Атрибут игрока (snakes[0]), доступный как атрибут движка
+    return property(lambda self: getattr(self.snakes[0], name),
+                    lambda self, value: setattr(self.snakes[0], name, value))
+
+
+class ArenaSnake:
+    """Змейка арены: тело и свои счет, множитель и неуязвимость.
+
+    Ботом управляет ArenaEngine.steer, остальными змейками - игроки.
+    """
+
+    # Те же правила поворота, что у SnakeEngine
+    turn = SnakeEngine.turn
+
+    def __init__(self, body, direction, bot=False, id=0):
+        self.id = id
+        self.bot = bot
+        self.snake = body
+        self.direction = direction
+        self.score = 0
+        self.score_multiplier = 1
+        self.invincible = False
+        self.invincible_timer = 0
+        self.alive = True
+        self.target = None  # клетка еды, к которой идет бот
+
+
+class ArenaEngine(SnakeEngine):
+    """Арена: игрок и боты на одном поле.
+
+    Тела всех змеек лежат в общей сетке занятости, поэтому столкновение
+    с любой змейкой - одна проверка клетки, и тик стоит O(число змеек),
+    без попарных сравнений. Змейки ходят по очереди, игрок первым, по тем
+    же правилам, что в SnakeEngine.step. Погибшая змейка убирается с поля,
+    бот сразу появляется в случайной свободной клетке, а змейка игрока
+    остается мертвой (alive = False). Игра заканчивается со смертью
+    snakes[0], если это не бот. Еды на поле несколько (FOOD_PER_SNAKE
+    на змейку), часть ее - специальная.
+
+    snake, direction, score и остальное состояние змейки - это атрибуты
+    игрока, поэтому SnakeGame ведет арену как обычную игру; food - ближайшая
+    к игроку еда на момент выбора (ее видит автопилот).
+    """
+
+    snake = player_attribute('snake')
+    direction = player_attribute('direction')
+    score = player_attribute('score')
+    score_multiplier = player_attribute('score_multiplier')
+    invincible = player_attribute('invincible')
+    invincible_timer = player_attribute('invincible_timer')
+
+    def __init__(self, cols, rows, bots=20, **kwargs):
+        self.bot_count = bots
+        super().__init__(cols, rows, **kwargs)
+
+    def reset(self, start=DEFAULT_START, direction=(1, 0), seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.random_pool = []
+        start = (min(start[0], self.cols - 1), min(start[1], self.rows - 1))
+        self.snakes = [ArenaSnake(SnakeBody(self.cols, [start]), direction)]
+        self.next_id = 1
+        self.food_cells = []  # индексы клеток с едой
+        self.food_pos = {}  # индекс клетки -> позиция в food_cells
+        self.food_kind = {}  # индекс клетки -> FOOD или SPECIAL
+        self.special_timers = {}  # индекс клетки -> сколько осталось жить
+        self.food = None
+        self.special_food = None  # специальная еда арены - в food_kind
+        self.special_food_timer = 0
+        self.game_over = False
+        self.won = False
+        self.ticks = 0
+        self.rebuild_occupancy()
+        for _ in range(self.bot_count):
+            self.add_snake()
+        self.refill_food()
+        self.aim()
+
+    player = property(lambda self: self.snakes[0])
+
+    def bodies(self):
+        return [snake.snake for snake in self.snakes if snake.alive]
+
+    def bots(self):
+        return self.snakes[1:]
+
+    def add_snake(self, bot=True):
+        # Новая змейка в случайной свободной клетке (если нашлась - alive)
+        snake = ArenaSnake(None, (1, 0), bot, self.next_id)
+        self.next_id += 1
+        self.snakes.append(snake)
+        self.respawn(snake)
+        return snake
+
+    def remove_snake(self, snake):
+        if snake.alive:
+            self.kill(snake)
+        self.snakes.remove(snake)
+
+    def random_free_cell(self):
+        # Случайная свободная клетка без еды или None
+        for _ in range(SPAWN_TRIES):
+            free_count = len(self.free_cells)
+            if not free_count:
+                return None
+            i = self.free_cells[int(self.uniform() * free_count)]
+            if i not in self.food_kind:
+                return i
+        return None
+
+    def respawn(self, bot):
+        i = self.random_free_cell()
+        bot.alive = i is not None
+        if not bot.alive:
+            return  # места нет - бот попробует на следующем тике
+        x, y = self.cell_at(i)
+        bot.snake = SnakeBody(self.cols, [(x, y)])
+        self.occupy(i)
+        # Направление с самым длинным свободным путем: игрок по сети
+        # успевает повернуть только через тик-другой после появления
+        runs = [self.free_run(x, y, direction) for direction in DIRECTIONS]
+        choices = [d for d, run in zip(DIRECTIONS, runs) if run == max(runs)]
+        bot.direction = choices[int(self.uniform() * len(choices))]
+        bot.score = 0
+        bot.score_multiplier = 1
+        bot.invincible = False
+        bot.invincible_timer = 0
+        bot.target = None
+
+    def free_run(self, x, y, direction):
+        # Сколько свободных клеток впереди, не больше SPAWN_RUN
+        for run in range(SPAWN_RUN):
+            x += direction[0]
+            y += direction[1]
+            if not self.in_bounds((x, y)) or self.is_occupied((x, y)):
+                return run
+        return SPAWN_RUN
+
+    def add_food(self, i, kind):
+        self.food_kind[i] = kind
+        self.food_pos[i] = len(self.food_cells)
+        self.food_cells.append(i)
+        if kind == SPECIAL:
+            self.special_timers[i] = self.special_food_time
+
+    def remove_food(self, i):
+        kind = self.food_kind.pop(i)
+        pos = self.food_pos.pop(i)
+        last = self.food_cells.pop()
+        if last != i:
+            self.food_cells[pos] = last
+            self.food_pos[last] = pos
+        self.special_timers.pop(i, None)
+        return kind
+
+    def refill_food(self):
+        target = max(1, int(len(self.snakes) * FOOD_PER_SNAKE))
+        while len(self.food_cells) < target:
+            i = self.random_free_cell()
+            if i is None:
+                return
+            special = self.uniform() < self.special_food_chance
+            self.add_food(i, SPECIAL if special else FOOD)
+
+    def aim(self):
+        # Ближайшая к голове игрока еда
+        head_y, head_x = divmod(self.snake.head(), self.cols)
+        best = None
+        for i in self.food_cells:
+            y, x = divmod(i, self.cols)
+            distance = abs(x - head_x) + abs(y - head_y)
+            if best is None or distance < best[0]:
+                best = (distance, i)
+        self.food = self.cell_at(best[1]) if best else None
+
+    def steer(self, bot):
+        # Жадный бот: безопасный ход, который ближе всего к своей еде
+        cols, rows = self.cols, self.rows
+        head_y, head_x = divmod(bot.snake.head(), cols)
+        if bot.target not in self.food_kind:
+            # Ближайшая из нескольких случайных: без перебора всей еды
+            bot.target = None
+            foods = self.food_cells
+            best = None
+            for _ in range(min(BOT_CHOICES, len(foods))):
+                i = foods[int(self.uniform() * len(foods))]
+                y, x = divmod(i, cols)
+                distance = abs(x - head_x) + abs(y - head_y)
+                if best is None or distance < best[0]:
+                    best = (distance, i)
+            if best:
+                bot.target = best[1]
+        target = bot.target
+        wander = target is None or self.uniform() < BOT_WANDER
+        if target is not None:
+            target_y, target_x = divmod(target, cols)
+        back = (-bot.direction[0], -bot.direction[1])
+        best = None
+        for direction in DIRECTIONS:
+            if direction == back:
+                continue
+            x = head_x + direction[0]
+            y = head_y + direction[1]
+            if bot.invincible:
+                x %= cols
+                y %= rows
+            elif not (0 <= x < cols and 0 <= y < rows) or self.occupied[y * cols + x]:
+                continue
+            if wander:
+                distance = self.uniform()
+            else:
+                distance = abs(x - target_x) + abs(y - target_y)
+            if best is None or distance < best[0]:
+                best = (distance, direction)
+        if best:
+            bot.direction = best[1]
+
+    def kill(self, snake):
+        for i in snake.snake.indices():
+            self.vacate(i)
+        snake.alive = False
+
+    def move(self, snake, dt):
+        # Один ход змейки по правилам SnakeEngine.step
+        if snake.invincible:
+            snake.invincible_timer -= dt
+            if snake.invincible_timer <= 0:
+                snake.invincible = False
+
+        cols = self.cols
+        body = snake.snake
+        head_y, head_x = divmod(body.head(), cols)
+        dx, dy = snake.direction
+        x = head_x + dx
+        y = head_y + dy
+        if snake.invincible:
+            # Неуязвимая змейка проходит сквозь стены и других змеек
+            x %= cols
+            y %= self.rows
+        elif not (0 <= x < cols and 0 <= y < self.rows) or self.occupied[y * cols + x]:
+            self.kill(snake)
+            return DEATH
+
+        new_head = y * cols + x
+        body.push(new_head)
+        self.occupy(new_head)
+        if new_head not in self.food_kind:
+            self.vacate(body.pop())
+            return MOVE
+        if self.remove_food(new_head) == FOOD:
+            snake.score += FOOD_POINTS * snake.score_multiplier
+            return FOOD
+        snake.score += SPECIAL_POINTS * snake.score_multiplier
+        snake.invincible = True
+        snake.invincible_timer = self.invincible_time
+        snake.score_multiplier = INVINCIBLE_MULTIPLIER
+        return SPECIAL
+
+    def step(self, action=None, dt=None):
+        if self.game_over:
+            return DEATH
+        if dt is None:
+            dt = self.tick
+        if action is not None:
+            self.turn(action)
+        self.ticks += 1
+
+        for i, left in list(self.special_timers.items()):
+            if left - dt <= 0:
+                self.remove_food(i)
+            else:
+                self.special_timers[i] = left - dt
+
+        event = MOVE
+        for number, snake in enumerate(self.snakes):
+            if not snake.alive:
+                if snake.bot:
+                    self.respawn(snake)
+                continue
+            if snake.bot:
+                self.steer(snake)
+            result = self.move(snake, dt)
+            if not number:
+                event = result
+                if result == DEATH and not snake.bot:
+                    self.game_over = True
+                    return DEATH
+            if result == DEATH and snake.bot:
+                self.respawn(snake)
+
+        self.refill_food()
+        food = self.food
+        if food is None or food[1] * self.cols + food[0] not in self.food_kind:
+            self.aim()
+        return event
@@ -0,0 +1,60 @@
+import threading
+
+EAT_SOUND = 'eat.wav'
+GAME_OVER_SOUND = 'game_over.wav'
+SOUNDS = (EAT_SOUND, GAME_OVER_SOUND)
+# Сколько копий (голосов) каждого звука загружать: один звук может
+# звучать несколько раз внахлест, не перезапуская себя же
+VOICES = 3
+
+
+class Assets:
+    """Ресурсы приложения, загруженные один раз на все игры.
+
+    Звуки читаются и декодируются в фоновом потоке при старте, дальше
+    каждая игра получает те же объекты по имени файла. Каждый звук
+    загружается в voice_count голосах для Mixer. Пока звук не
+    загрузился (или файла нет), sound() возвращает None, а voices() -
+    пустой список, и звук просто не играет. loader - объект с методом
+    load(имя), в игре это SoundLoader Kivy.
+    """
+
+    def __init__(self, loader, voice_count=VOICES):
+        self.loader = loader
+        self.voice_count = voice_count
+        self.sounds = {}  # имя файла -> список голосов
+        self.thread = None
+
+    def preload(self, names=SOUNDS):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.load_sounds, args=(names,), daemon=True)
+            self.thread.start()
+
+    def load_sounds(self, names):
+        for name in names:
+            if name in self.sounds:
+                continue
+            voices = []
+            for _ in range(self.voice_count):
+                try:
+                    sound = self.loader.load(name)
+                except:
+                    sound = None
+                if sound is None:
+                    break
+                voices.append(sound)
+            if not voices:
+                print(f"Звуковой файл не найден: {name}")
+            self.sounds[name] = voices
+
+    def voices(self, name):
+        return self.sounds.get(name, [])
+
+    def sound(self, name):
+        voices = self.voices(name)
+        return voices[0] if voices else None
+
+    def wait(self, timeout=None):
+        # Дождаться фоновой загрузки (для тестов и замеров)
+        if self.thread is not None:
+            self.thread.join(timeout)
@@ -0,0 +1,150 @@
+from array import array
+
+from engine import DIRECTIONS
+
+# Сколько клеток поиск от еды раскрывает за один тик
+SEARCH_BUDGET = 4096
+# Сколько свободных клеток достаточно, чтобы считать ход безопасным
+ROOM_LIMIT = 1024
+
+
+class Autopilot:
+    """Выбирает направление змейки на каждом тике.
+
+    От еды строится карта расстояний поиском в ширину по свободным
+    клеткам. Карта переиспользуется, пока еда на месте: клетки только
+    освобождаются хвостом, а новые занятые клетки лежат позади головы,
+    поэтому змейка просто спускается по расстояниям. Поиск раскрывает
+    не больше SEARCH_BUDGET клеток за тик и продолжается на следующих
+    тиках, поэтому даже на поле 200x200 тик укладывается в несколько
+    миллисекунд; пока карта не дошла до головы, змейка идет туда, где
+    больше места.
+
+    Перед каждым ходом проверяется, что из новой клетки достижим хвост
+    или хватает места на всю змейку (но не больше ROOM_LIMIT клеток -
+    так проверка стоит одинаково и для очень длинных змеек).
+
+    Поиск идет по сетке с рамкой шириной в клетку: стены - такие же
+    занятые клетки, и во внутреннем цикле не нужны проверки границ.
+    """
+
+    def __init__(self):
+        self.food = None
+        self.board = None
+        self.dist = None
+        self.visited = None
+        self.frontier = []  # клетки на расстоянии level, еще не раскрытые
+        self.following = []  # уже найденные клетки на расстоянии level + 1
+        self.level = 0
+
+    def padded(self, engine):
+        # Копия занятости с рамкой: 1 - стена или тело
+        cols, rows = engine.cols, engine.rows
+        width = cols + 2
+        blocked = bytearray(b'\x01') * (width * (rows + 2))
+        occupied = engine.occupied
+        for y in range(rows):
+            start = (y + 1) * width + 1
+            blocked[start:start + cols] = occupied[y * cols:(y + 1) * cols]
+        return blocked, width
+
+    def index(self, cell, width):
+        return (cell[1] + 1) * width + cell[0] + 1
+
+    def start_search(self, engine, blocked, width):
+        self.food = engine.food
+        self.board = (engine.cols, engine.rows)
+        self.visited = bytearray(blocked)
+        self.dist = array('i', [-1]) * len(blocked)
+        start = self.index(engine.food, width)
+        self.dist[start] = 0
+        self.visited[start] = 1
+        self.frontier = [start]
+        self.following = []
+        self.level = 0
+
+    def searching(self):
+        return bool(self.frontier or self.following)
+
+    def search(self, width, targets):
+        # Раскрываем клетки, пока карта не дошла до одной из targets
+        # или не кончился бюджет тика; уровень можно прервать посередине
+        visited = self.visited
+        dist = self.dist
+        budget = SEARCH_BUDGET
+        while budget > 0:
+            if any(dist[i] >= 0 for i in targets):
+                return
+            if not self.frontier:
+                if not self.following:
+                    return
+                self.frontier, self.following = self.following, []
+                self.level += 1
+            d = self.level + 1
+            frontier = self.frontier
+            append = self.following.append
+            while frontier and budget > 0:
+                i = frontier.pop()
+                budget -= 1
+                for j in (i - 1, i + 1, i - width, i + width):
+                    if not visited[j]:
+                        visited[j] = 1
+                        dist[j] = d
+                        append(j)
+
+    def room(self, engine, blocked, width, start):
+        # Поиск в ширину из start до хвоста; останавливается, как только
+        # найден хвост или набралось достаточно клеток
+        tail = self.index(engine.snake[-1], width)
+        need = min(len(engine.snake), ROOM_LIMIT)
+        seen = {start}
+        frontier = [start]
+        while frontier:
+            following = []
+            for i in frontier:
+                for j in (i - 1, i + 1, i - width, i + width):
+                    if j == tail:
+                        return True, len(seen)
+                    if blocked[j] or j in seen:
+                        continue
+                    seen.add(j)
+                    following.append(j)
+            if len(seen) >= need:
+                return True, len(seen)
+            frontier = following
+        return False, len(seen)
+
+    def candidates(self, engine, width):
+        head_x, head_y = engine.snake[0]
+        back = (-engine.direction[0], -engine.direction[1])
+        cells = {}
+        for direction in DIRECTIONS:
+            if direction == back:
+                continue
+            cell = (head_x + direction[0], head_y + direction[1])
+            if engine.in_bounds(cell) and not engine.is_occupied(cell):
+                cells[self.index(cell, width)] = direction
+        return cells
+
+    def choose(self, engine):
+        blocked, width = self.padded(engine)
+        cells = self.candidates(engine, width)
+        if not cells:
+            return engine.direction
+        if engine.food is None:
+            return next(iter(cells.values()))
+
+        if self.food != engine.food or self.board != (engine.cols, engine.rows):
+            self.start_search(engine, blocked, width)
+        self.search(width, cells)
+        ranked = sorted((self.dist[i], i) for i in cells if self.dist[i] >= 0)
+        if not ranked and not self.searching():
+            # Карта устарела и до головы не доходит - начинаем заново
+            self.start_search(engine, blocked, width)
+
+        for _, i in ranked:
+            if self.room(engine, blocked, width, i)[0]:
+                return cells[i]
+        # Безопасного пути к еде нет - идем туда, где больше места
+        best = max(cells, key=lambda i: self.room(engine, blocked, width, i))
+        return cells[best]
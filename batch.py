@@ -0,0 +1,125 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import random
+import sys
+
+from engine import (SnakeEngine, DIRECTIONS, FOOD, SPECIAL, DEFAULT_TICK,
+                    SPECIAL_FOOD_CHANCE, SPECIAL_FOOD_TIME, INVINCIBLE_TIME, cycle_direction)
+from autopilot import Autopilot
+
+FIELDS = ('game', 'seed', 'policy', 'score', 'length', 'ticks', 'foods', 'specials', 'won')
+
+
+def autopilot_policy(seed):
+    return Autopilot().choose
+
+
+def cycle_policy(seed):
+    # Обход по гамильтонову циклу (нужно четное число строк)
+    return lambda engine: cycle_direction(engine.snake[0], engine.cols, engine.rows)
+
+
+def random_policy(seed):
+    rng = random.Random(seed)
+
+    def choose(engine):
+        if rng.random() < 0.2:
+            return rng.choice(DIRECTIONS)
+        return engine.direction
+    return choose
+
+
+POLICIES = {
+    'autopilot': autopilot_policy,
+    'cycle': cycle_policy,
+    'random': random_policy,
+}
+
+
+def run_game(job):
+    # Одна игра в процессе пула; аргументы - кортеж, чтобы передавать через imap
+    game, seed, options = job
+    engine = SnakeEngine(options['cols'], options['rows'], tick=options['tick'], seed=seed,
+                         special_food_chance=options['special_chance'],
+                         special_food_time=options['special_time'],
+                         invincible_time=options['invincible_time'])
+    choose = POLICIES[options['policy']](seed)
+    foods = specials = 0
+    while not engine.game_over and engine.ticks < options['max_ticks']:
+        event = engine.step(choose(engine))
+        if event == FOOD:
+            foods += 1
+        elif event == SPECIAL:
+            specials += 1
+    return {
+        'game': game,
+        'seed': seed,
+        'policy': options['policy'],
+        'score': engine.score,
+        'length': len(engine.snake),
+        'ticks': engine.ticks,
+        'foods': foods,
+        'specials': specials,
+        'won': engine.won,
+    }
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Пакетный прогон игр без окна')
+    parser.add_argument('--headless', action='store_true',
+                        help='режим без окна (для запуска через main.py)')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0, help='сид первой игры, дальше +1')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='autopilot')
+    parser.add_argument('--cols', type=int, default=38)
+    parser.add_argument('--rows', type=int, default=28)
+    parser.add_argument('--tick', type=float, default=DEFAULT_TICK)
+    parser.add_argument('--max-ticks', type=int, default=100000)
+    parser.add_argument('--special-chance', type=float, default=SPECIAL_FOOD_CHANCE)
+    parser.add_argument('--special-time', type=float, default=SPECIAL_FOOD_TIME)
+    parser.add_argument('--invincible-time', type=float, default=INVINCIBLE_TIME)
+    parser.add_argument('--out', default='-',
+                        help='файл .csv или .jsonl; "-" - JSON Lines в stdout')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = {
+        'cols': args.cols,
+        'rows': args.rows,
+        'tick': args.tick,
+        'policy': args.policy,
+        'max_ticks': args.max_ticks,
+        'special_chance': args.special_chance,
+        'special_time': args.special_time,
+        'invincible_time': args.invincible_time,
+    }
+    jobs = [(game, args.seed + game, options) for game in range(args.games)]
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', newline='')
+    as_csv = args.out.endswith('.csv')
+    writer = csv.DictWriter(out, fieldnames=FIELDS) if as_csv else None
+    if writer:
+        writer.writeheader()
+    try:
+        # Результаты пишутся по мере готовности, порядок игр не сохраняется
+        with multiprocessing.Pool(args.workers) as pool:
+            for row in pool.imap_unordered(run_game, jobs, chunksize=4):
+                if writer:
+                    writer.writerow(row)
+                else:
+                    out.write(json.dumps(row) + '\n')
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,370 @@
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import types
+
+from engine import SnakeEngine, DEATH, WIN, cycle_direction, cycle_cells
+
+DEFAULT_LENGTHS = (1, 10, 100, 1000, 10000, 100000)
+DEFAULT_FILLS = (0, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def board_for(length):
+    # Квадратное поле с четной стороной, примерно вдвое больше змейки
+    side = max(32, math.ceil(math.sqrt(2 * length)))
+    side += side % 2
+    return side, side
+
+
+def place_snake(engine, length):
+    # Змейка длины length лежит на цикле головой вперед
+    cells = cycle_cells(engine.cols, engine.rows, length)
+    cells.reverse()
+    engine.set_snake(cells)
+    engine.direction = cycle_direction(cells[0], engine.cols, engine.rows)
+    engine.special_food = None
+    engine.create_food()
+
+
+def bench_engine(lengths, ticks):
+    results = []
+    for length in lengths:
+        cols, rows = board_for(length)
+        engine = SnakeEngine(cols, rows, seed=1)
+        place_snake(engine, length)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            engine.turn(cycle_direction(engine.snake[0], cols, rows))
+            if engine.step() in (DEATH, WIN):
+                engine.reset(seed=1)
+                place_snake(engine, length)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'length': length,
+            'board': [cols, rows],
+            'ticks': ticks,
+            'ticks_per_sec': ticks / elapsed,
+        })
+    return results
+
+
+def bench_spawn(fills, calls, side=200):
+    results = []
+    cells = side * side
+    for fill in fills:
+        engine = SnakeEngine(side, side, seed=1)
+        place_snake(engine, max(1, int(cells * fill)))
+        start = time.perf_counter()
+        for _ in range(calls):
+            engine.create_food()
+        elapsed = time.perf_counter() - start
+        results.append({
+            'fill': fill,
+            'board': [side, side],
+            'calls': calls,
+            'usec_per_call': elapsed / calls * 1e6,
+        })
+    return results
+
+
+def bench_arena(counts, ticks, side=120):
+    # Тик арены на змейку: при общей сетке занятости он не растет с числом ботов
+    from arena import ArenaEngine
+    results = []
+    for count in counts:
+        engine = ArenaEngine(side, side, bots=count, seed=1)
+        start = time.perf_counter()
+        for _ in range(ticks):
+            engine.turn(cycle_direction(engine.snake[0], side, side))
+            if engine.step() == DEATH:
+                engine.reset(seed=1)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'bots': count,
+            'board': [side, side],
+            'ticks': ticks,
+            'usec_per_tick': elapsed / ticks * 1e6,
+            'usec_per_snake': elapsed / ticks / (count + 1) * 1e6,
+        })
+    return results
+
+
+def bench_vec(counts, ticks, side=38):
+    # Шаги всех полей VecSnakeEnv в секунду при случайных действиях
+    import numpy as np
+    from vecenv import VecSnakeEnv
+    results = []
+    for count in counts:
+        env = VecSnakeEnv(count, side, side, seed=1)
+        actions = np.random.default_rng(1).integers(-1, 4, size=(ticks, count))
+        start = time.perf_counter()
+        for action in actions:
+            env.step(action)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'envs': count,
+            'board': [side, side],
+            'ticks': ticks,
+            'env_steps_per_sec': count * ticks / elapsed,
+        })
+    return results
+
+
+def count_instructions(group):
+    total = 0
+    for child in group.children:
+        total += 1
+        if hasattr(child, 'children'):
+            total += count_instructions(child)
+    return total
+
+
+def bench_game(lengths, ticks, batched_render=False):
+    # Импорт здесь: Kivy (или заглушки) должны быть подготовлены заранее
+    import main
+    app = main.SnakeApp()
+    app.batched_render = batched_render
+    app.high_score = float('inf')  # рекорд не сохраняется
+    app.show_game_over = lambda score: None
+    results = []
+    for length in lengths:
+        cols, rows = board_for(length)
+        game = main.SnakeGame(size=(cols * 20 + 40, rows * 20 + 40))
+        game.start_game()
+        game.recorder = None  # запись игры не сохраняется
+        engine = game.engine
+        place_snake(engine, length)
+        game.body_rects = None
+        game.draw_snake()
+
+        start = time.perf_counter()
+        for _ in range(ticks):
+            engine.turn(cycle_direction(engine.snake[0], cols, rows))
+            game.update(game.speed)
+            if game.game_over:
+                break
+        elapsed = time.perf_counter() - start
+        done = engine.ticks
+        # Отдельно - только отрисовка кадра без шага логики
+        start = time.perf_counter()
+        for _ in range(ticks):
+            game.draw_snake()
+            game.interpolate(0.5)
+        draw_time = time.perf_counter() - start
+        results.append({
+            'length': length,
+            'board': [cols, rows],
+            'ticks': done,
+            'update_ticks_per_sec': done / elapsed,
+            'draw_usec_per_frame': draw_time / ticks * 1e6,
+            'instructions': count_instructions(game.canvas.after),
+        })
+        game.end_game()
+    return results
+
+
+def install_stub_kivy():
+    # Заглушки вместо Kivy: инструкции только хранят атрибуты, окно не нужно.
+    # Время отрисовки на заглушках - это только стоимость кода на Python.
+    class Instruction:
+        def __init__(self, *args, **kwargs):
+            self.args = args
+            self.__dict__.update(kwargs)
+            if _active:
+                _active[-1].add(self)
+
+    class InstructionGroup:
+        def __init__(self, **kwargs):
+            self.children = []
+
+        def add(self, instruction):
+            self.children.append(instruction)
+
+        def insert(self, index, instruction):
+            self.children.insert(index, instruction)
+
+        def remove(self, instruction):
+            self.children.remove(instruction)
+
+        def clear(self):
+            self.children = []
+
+        def __enter__(self):
+            _active.append(self)
+            return self
+
+        def __exit__(self, *args):
+            _active.pop()
+
+    class Canvas(InstructionGroup):
+        def __init__(self, **kwargs):
+            super().__init__()
+            self.before = InstructionGroup()
+            self.after = InstructionGroup()
+
+    class Color(Instruction):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.rgba = args
+
+    class ClockEvent:
+        def __init__(self, callback):
+            self.callback = callback
+
+        def __call__(self, *args):
+            pass
+
+        def cancel(self):
+            pass
+
+    class Clock:
+        schedule_interval = staticmethod(lambda callback, timeout: ClockEvent(callback))
+        schedule_once = staticmethod(lambda callback, timeout=0: ClockEvent(callback))
+        create_trigger = staticmethod(lambda callback, timeout=0: ClockEvent(callback))
+        unschedule = staticmethod(lambda callback: None)
+        get_time = staticmethod(time.perf_counter)
+
+    class EventDispatcher:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+        def bind(self, **kwargs):
+            pass
+
+    class Widget(EventDispatcher):
+        def __init__(self, **kwargs):
+            self.canvas = Canvas()
+            self.children = []
+            self.parent = None
+            self.pos = (0, 0)
+            self.size = (100, 100)
+            self.text = ''
+            super().__init__(**kwargs)
+
+        x = property(lambda self: self.pos[0])
+        y = property(lambda self: self.pos[1])
+        width = property(lambda self: self.size[0])
+        height = property(lambda self: self.size[1])
+
+        def add_widget(self, widget, *args, **kwargs):
+            self.children.append(widget)
+            widget.parent = self
+
+        def remove_widget(self, widget):
+            self.children.remove(widget)
+            widget.parent = None
+
+        def clear_widgets(self):
+            for widget in self.children:
+                widget.parent = None
+            self.children = []
+
+    class App(EventDispatcher):
+        running = None
+
+        def __init__(self, **kwargs):
+            super().__init__(**kwargs)
+            App.running = self
+
+        @staticmethod
+        def get_running_app():
+            return App.running
+
+    class SoundLoader:
+        load = staticmethod(lambda filename: None)
+
+    class Logger:
+        info = warning = error = debug = staticmethod(lambda *args, **kwargs: None)
+
+    _active = []
+    graphics = {name: type(name, (Instruction,), {}) for name in (
+        'Rectangle', 'Ellipse', 'Line', 'Mesh', 'PushMatrix', 'PopMatrix',
+        'Scale', 'Translate')}
+    graphics.update(Color=Color, InstructionGroup=InstructionGroup, Canvas=Canvas)
+    widgets = {name: type(name, (Widget,), {}) for name in (
+        'Label', 'Button', 'BoxLayout', 'Slider')}
+    modules = {
+        'kivy': {},
+        'kivy.app': {'App': App},
+        'kivy.uix': {},
+        'kivy.uix.widget': {'Widget': Widget},
+        'kivy.uix.label': {'Label': widgets['Label']},
+        'kivy.uix.button': {'Button': widgets['Button']},
+        'kivy.uix.boxlayout': {'BoxLayout': widgets['BoxLayout']},
+        'kivy.uix.slider': {'Slider': widgets['Slider']},
+        'kivy.graphics': graphics,
+        'kivy.clock': {'Clock': Clock},
+        'kivy.event': {'EventDispatcher': EventDispatcher},
+        'kivy.properties': {'NumericProperty': lambda value=0: value,
+                            'BooleanProperty': lambda value=False: value,
+                            'ObjectProperty': lambda value=None: value},
+        'kivy.core': {},
+        'kivy.core.audio': {'SoundLoader': SoundLoader},
+        'kivy.metrics': {'dp': lambda value: value},
+        'kivy.logger': {'Logger': Logger},
+    }
+    for name, attrs in modules.items():
+        module = types.ModuleType(name)
+        module.__dict__.update(attrs)
+        sys.modules[name] = module
+
+
+def parse_list(text, cast):
+    return tuple(cast(item) for item in text.split(','))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарки горячих путей змейки')
+    parser.add_argument('--lengths', type=lambda s: parse_list(s, int), default=DEFAULT_LENGTHS)
+    parser.add_argument('--fills', type=lambda s: parse_list(s, float), default=DEFAULT_FILLS)
+    parser.add_argument('--ticks', type=int, default=2000)
+    parser.add_argument('--spawn-calls', type=int, default=10000)
+    parser.add_argument('--stub', action='store_true',
+                        help='заглушка вместо Kivy (без окна и OpenGL)')
+    parser.add_argument('--no-game', action='store_true',
+                        help='только движок, без SnakeGame')
+    parser.add_argument('--mesh', action='store_true',
+                        help='пакетная отрисовка тела (SnakeMeshRenderer)')
+    parser.add_argument('--arena-bots', type=lambda s: parse_list(s, int), default=(),
+                        help='числа ботов арены через запятую')
+    parser.add_argument('--vec-envs', type=lambda s: parse_list(s, int), default=(),
+                        help='размеры VecSnakeEnv через запятую (нужен numpy)')
+    parser.add_argument('--out', default='bench_results.json')
+    args = parser.parse_args(argv)
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'canvas': 'stub' if args.stub else 'kivy',
+            'mesh': args.mesh,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'engine': bench_engine(args.lengths, args.ticks),
+        'spawn': bench_spawn(args.fills, args.spawn_calls),
+    }
+    if args.arena_bots:
+        results['arena'] = bench_arena(args.arena_bots, args.ticks)
+    if args.vec_envs:
+        results['vec'] = bench_vec(args.vec_envs, min(args.ticks, 500))
+    if not args.no_game:
+        if args.stub:
+            install_stub_kivy()
+        else:
+            # Нужен GL-контекст: без дисплея запускать через xvfb-run
+            from kivy.core.window import Window  # noqa: F401
+        results['game'] = bench_game(args.lengths, args.ticks, batched_render=args.mesh)
+
+    with open(args.out, 'w') as f:
+        json.dump(results, f, indent=2)
+    for section in ('engine', 'spawn', 'arena', 'vec', 'game'):
+        for row in results.get(section, ()):
+            print(section, json.dumps(row))
+    return results
+
+
+if __name__ == '__main__':
+    main()
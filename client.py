@@ -0,0 +1,264 @@
+import asyncio
+import json
+import queue
+import threading
+
+from arena import ArenaEngine
+from engine import SnakeEngine, SnakeBody, DIRECTIONS, MOVE, FOOD, SPECIAL, DEATH
+from server import encode
+
+# Сколько ждать ответа сервера при входе в комнату, секунд
+CONNECT_TIMEOUT = 5
+
+
+class RemoteSnake:
+    """Змейка на клиенте: тело и счет по данным сервера."""
+
+    def __init__(self, body):
+        self.snake = body
+        self.alive = True
+        self.score = 0
+        self.score_multiplier = 1
+        self.invincible_timer = 0
+
+
+class RemoteArena:
+    """Копия арены на клиенте, собранная из снимка и дельт сервера.
+
+    Правила здесь не считаются: step() только применяет пришедшие дельты.
+    Атрибуты те же, что у ArenaEngine, поэтому SnakeGame рисует сетевую
+    игру так же, как арену, а повороты (turn) уходят на сервер.
+    """
+
+    cell_at = SnakeEngine.cell_at
+    in_bounds = SnakeEngine.in_bounds
+    is_occupied = SnakeEngine.is_occupied
+    aim = ArenaEngine.aim
+
+    def __init__(self, welcome, send=None):
+        self.id = welcome['id']
+        self.cols = welcome['cols']
+        self.rows = welcome['rows']
+        self.tick = welcome['tick']
+        self.send = send
+        self.seed = 0
+        self.profiler = None
+        self.ticks = 0
+        self.occupied = bytearray(self.cols * self.rows)
+        self.snakes = {}
+        self.food_cells = []
+        self.food_kind = {}
+        self.food = None
+        self.special_food = None  # специальная еда - в food_kind
+        self.direction = (1, 0)
+        self.game_over = False
+        self.won = False
+        self.me = RemoteSnake(SnakeBody(self.cols))
+
+    snake = property(lambda self: self.me.snake)
+    score = property(lambda self: self.me.score)
+    score_multiplier = property(lambda self: self.me.score_multiplier)
+    invincible = property(lambda self: self.me.invincible_timer > 0)
+    invincible_timer = property(lambda self: self.me.invincible_timer)
+
+    def bots(self):
+        return [snake for snake in self.snakes.values() if snake is not self.me]
+
+    def turn(self, direction):
+        # Разворот отсекается сразу, остальное решает сервер
+        if direction == (-self.direction[0], -self.direction[1]):
+            return False
+        self.direction = direction
+        if self.send:
+            self.send({'dir': DIRECTIONS.index(direction)})
+        return True
+
+    def add_snake(self, snake_id, cells, direction):
+        self.remove_snake(snake_id)
+        body = SnakeBody(self.cols)
+        for i in reversed(cells):
+            body.push(i)
+            self.occupied[i] += 1
+        snake = self.me if snake_id == self.id else RemoteSnake(body)
+        snake.snake = body
+        snake.alive = True
+        self.snakes[snake_id] = snake
+        if snake is self.me:
+            self.direction = DIRECTIONS[direction]
+
+    def remove_snake(self, snake_id):
+        snake = self.snakes.pop(snake_id, None)
+        if snake:
+            for i in snake.snake.indices():
+                self.occupied[i] -= 1
+            snake.alive = False
+
+    def apply(self, message):
+        # Применяет снимок или дельту; возвращает событие для своей змейки
+        if message.get('full'):
+            for snake_id in list(self.snakes):
+                self.remove_snake(snake_id)
+            self.food_cells = []
+            self.food_kind = {}
+        event = MOVE
+        cols = self.cols
+        for snake_id, head, grew in message.get('m', ()):
+            snake = self.snakes.get(snake_id)
+            if snake is None:
+                continue
+            body = snake.snake
+            if snake is self.me:
+                old_y, old_x = divmod(body.head(), cols)
+                new_y, new_x = divmod(head, cols)
+                if abs(new_x - old_x) + abs(new_y - old_y) == 1:
+                    self.direction = (new_x - old_x, new_y - old_y)
+                if grew:
+                    event = SPECIAL if self.food_kind.get(head) == SPECIAL else FOOD
+            body.push(head)
+            self.occupied[head] += 1
+            if not grew:
+                self.occupied[body.pop()] -= 1
+        for snake_id in message.get('x', ()):
+            if snake_id == self.id:
+                event = DEATH
+            self.remove_snake(snake_id)
+        for snake_id, cells, direction in message.get('s', ()):
+            self.add_snake(snake_id, cells, direction)
+        for i in message.get('e', ()):
+            self.food_kind.pop(i, None)
+        for i, special in message.get('f', ()):
+            self.food_kind[i] = SPECIAL if special else FOOD
+        if 'e' in message or 'f' in message or message.get('full'):
+            self.food_cells = list(self.food_kind)
+        scored = set()
+        for snake_id, score, multiplier, timer in message.get('sc', ()):
+            snake = self.snakes.get(snake_id)
+            if snake:
+                snake.score = score
+                snake.score_multiplier = multiplier
+                snake.invincible_timer = timer
+                scored.add(snake_id)
+        # Таймер из этого же сообщения уже серверный - его не уменьшаем
+        if self.me.invincible_timer > 0 and self.id not in scored and not message.get('full'):
+            self.me.invincible_timer -= self.tick
+        self.ticks = message.get('t', self.ticks)
+        food = self.food
+        if food is None or food[1] * cols + food[0] not in self.food_kind:
+            if self.me.alive:
+                self.aim()
+        return event
+
+    def step(self, action=None, dt=None, messages=()):
+        # Применяет все дельты, пришедшие с прошлого вызова
+        if self.game_over:
+            return DEATH
+        if action is not None:
+            self.turn(action)
+        event = MOVE
+        for message in messages:
+            result = self.apply(message)
+            if result != MOVE:
+                event = result
+            if result == DEATH:
+                self.game_over = True
+                break
+        return event
+
+
+class ArenaConnection:
+    """Соединение с сервером в фоновом потоке со своим циклом asyncio.
+
+    Подключение и вход в комнату идут в этом потоке: когда пришли
+    приветствие, снимок и своя змейка, вызывается on_ready(game) с
+    готовой NetworkGame, при ошибке - on_error(текст). Оба вызова -
+    из фонового потока. Дальше строки от сервера складываются в
+    очередь, игра забирает их в step() на своем тике, поэтому Kivy и
+    сеть не ждут друг друга.
+    """
+
+    def __init__(self, host, port, room='main', on_ready=None, on_error=None):
+        self.host = host
+        self.port = port
+        self.room = room
+        self.on_ready = on_ready
+        self.on_error = on_error
+        self.inbox = queue.SimpleQueue()
+        self.loop = None
+        self.writer = None
+        self.game = None
+        self.thread = threading.Thread(target=self.run_loop, daemon=True)
+        self.thread.start()
+
+    def run_loop(self):
+        try:
+            asyncio.run(self.receive())
+        except (OSError, ValueError, asyncio.TimeoutError) as error:
+            if self.game is None and self.on_error:
+                self.on_error(str(error) or 'нет ответа сервера')
+        finally:
+            self.inbox.put(None)
+
+    async def read(self, reader):
+        line = await asyncio.wait_for(reader.readline(), CONNECT_TIMEOUT)
+        if not line:
+            raise OSError('сервер закрыл соединение')
+        message = json.loads(line)
+        if 'error' in message:
+            raise OSError(message['error'])
+        return message
+
+    async def receive(self):
+        self.loop = asyncio.get_running_loop()
+        reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), CONNECT_TIMEOUT)
+        self.writer.write(encode({'join': self.room}))
+        game = NetworkGame(await self.read(reader), self)
+        # Снимок комнаты, затем дельта, в которой появляется своя змейка
+        while game.id not in game.snakes:
+            game.apply(await self.read(reader))
+        self.game = game
+        if self.on_ready:
+            self.on_ready(game)
+        async for line in reader:
+            self.inbox.put(json.loads(line))
+
+    def send(self, message):
+        if self.loop and self.writer:
+            self.loop.call_soon_threadsafe(self.writer.write, encode(message))
+
+    def messages(self):
+        # Все пришедшие сообщения без ожидания; None - соединение закрыто
+        result = []
+        while True:
+            try:
+                message = self.inbox.get_nowait()
+            except queue.Empty:
+                return result
+            result.append(message)
+            if message is None:
+                return result
+
+    def close(self):
+        if self.loop and self.writer:
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class NetworkGame(RemoteArena):
+    """Сетевая игра для SnakeGame: RemoteArena поверх ArenaConnection.
+
+    Создается самим ArenaConnection, когда вход в комнату состоялся.
+    """
+
+    def __init__(self, welcome, connection):
+        super().__init__(welcome, connection.send)
+        self.connection = connection
+
+    def step(self, action=None, dt=None):
+        messages = self.connection.messages()
+        if None in messages:
+            # Сервер закрыл соединение - игра окончена
+            messages = [m for m in messages if m is not None] + [{'x': [self.id]}]
+        return super().step(action, dt, messages)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,355 @@
+import random
+import time
+from array import array
+
+# События, которые возвращает SnakeEngine.step
+MOVE = 'move'
+FOOD = 'food'
+SPECIAL = 'special'
+DEATH = 'death'
+WIN = 'win'  # поле заполнено, еду положить некуда
+
+DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+# Правила игры
+FOOD_POINTS = 1
+SPECIAL_POINTS = 5
+SPECIAL_FOOD_CHANCE = 0.3  # 30% шанс
+SPECIAL_FOOD_TIME = 10  # 10 секунд
+INVINCIBLE_TIME = 5  # 5 секунд неуязвимости
+INVINCIBLE_MULTIPLIER = 2
+
+DEFAULT_TICK = 0.2
+DEFAULT_START = (4, 4)
+
+
+_ramp = array('i')
+
+
+def ramp(size):
+    # Массив 0, 1, 2, ... не короче size; общий для всех движков и только растет
+    if len(_ramp) < size:
+        _ramp.extend(range(len(_ramp), size))
+    return _ramp
+
+
+def cycle_direction(cell, cols, rows):
+    # Гамильтонов цикл по полю с четным числом строк: змейка на нем не умирает.
+    # Строки обходятся "змейкой" от x=1, столбец x=0 - обратный путь вниз.
+    x, y = cell
+    if x == 0:
+        return (0, -1) if y > 0 else (1, 0)
+    if y % 2 == 0:
+        return (1, 0) if x < cols - 1 else (0, 1)
+    if x > 1 or y == rows - 1:
+        return (-1, 0)
+    return (0, 1)
+
+
+def cycle_cells(cols, rows, count):
+    cells = []
+    cell = (1, 0)
+    for _ in range(count):
+        cells.append(cell)
+        dx, dy = cycle_direction(cell, cols, rows)
+        cell = (cell[0] + dx, cell[1] + dy)
+    return cells
+
+
+class SnakeBody:
+    """Тело змейки - кольцевой буфер индексов клеток (y * cols + x).
+
+    body[0] - голова, body[-1] - хвост; по индексу и при обходе клетки
+    выдаются кортежами (x, y), как раньше в deque. На сегмент уходит
+    4 байта вместо кортежа, а ход змейки (push головы и pop хвоста)
+    не создает новых объектов. Заполненный буфер растет вдвое.
+    """
+
+    def __init__(self, cols, cells=()):
+        self.cols = cols
+        capacity = 16
+        while capacity <= len(cells):
+            capacity *= 2
+        self.data = array('i', [0]) * capacity
+        self.mask = capacity - 1
+        self.start = 0  # позиция головы в data
+        self.size = 0
+        for x, y in reversed(cells):
+            self.push(y * cols + x)
+
+    def __len__(self):
+        return self.size
+
+    def index(self, i):
+        # Индекс клетки i-го сегмента (отрицательные i - от хвоста)
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError('сегмента нет')
+        return self.data[(self.start + i) & self.mask]
+
+    def head(self):
+        return self.data[self.start]
+
+    def __getitem__(self, i):
+        y, x = divmod(self.index(i), self.cols)
+        return (x, y)
+
+    def indices(self):
+        data, mask, start = self.data, self.mask, self.start
+        for i in range(self.size):
+            yield data[(start + i) & mask]
+
+    def __iter__(self):
+        cols = self.cols
+        for index in self.indices():
+            y, x = divmod(index, cols)
+            yield (x, y)
+
+    def push(self, index):
+        # Новая голова
+        if self.size > self.mask:
+            self.grow()
+        self.start = (self.start - 1) & self.mask
+        self.data[self.start] = index
+        self.size += 1
+
+    def pop(self):
+        # Убирает хвост и возвращает индекс его клетки
+        self.size -= 1
+        return self.data[(self.start + self.size) & self.mask]
+
+    def grow(self):
+        # Переносим сегменты в начало вдвое большего буфера
+        data = array('i', self.indices())
+        data.extend(array('i', [0]) * len(data))
+        self.data = data
+        self.mask = len(data) - 1
+        self.start = 0
+
+
+class SnakeEngine:
+    """Игровая логика змейки без Kivy.
+
+    Поле задается в клетках (cols x rows), змейка и еда хранятся
+    как кортежи (x, y) в клетках. Один вызов step() - один игровой тик.
+    Занятость клеток хранится в плоской сетке occupied (число сегментов
+    в клетке), поэтому проверка столкновения не зависит от длины змейки.
+    Свободные клетки лежат в массиве free_cells, а free_pos хранит
+    позицию клетки в нем (-1 - клетка занята): еда создается за O(1).
+    Тело змейки - SnakeBody, кольцевой буфер индексов клеток.
+    Случайность берется только из собственного генератора игры с сидом
+    seed, поэтому игру с тем же сидом и теми же ходами можно повторить.
+    """
+
+    def __init__(self, cols, rows, tick=DEFAULT_TICK, seed=None, rng_batch=0,
+                 special_food_chance=SPECIAL_FOOD_CHANCE,
+                 special_food_time=SPECIAL_FOOD_TIME,
+                 invincible_time=INVINCIBLE_TIME):
+        self.cols = cols
+        self.rows = rows
+        self.tick = tick
+        # Параметры специальной еды можно менять для подбора баланса
+        self.special_food_chance = special_food_chance
+        self.special_food_time = special_food_time
+        self.invincible_time = invincible_time
+        # rng_batch > 0 - случайные числа генерируются пачками такого размера
+        self.rng_batch = rng_batch
+        # Необязательный профайлер фаз (profiler.TickProfiler)
+        self.profiler = None
+        self.reset(seed=seed)
+
+    def reset(self, start=DEFAULT_START, direction=(1, 0), seed=None):
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.random_pool = []
+        start = (min(start[0], self.cols - 1), min(start[1], self.rows - 1))
+        self.set_snake([start])
+        self.direction = direction
+        self.food = None
+        self.special_food = None
+        self.special_food_timer = 0
+        self.score = 0
+        self.score_multiplier = 1
+        self.invincible = False
+        self.invincible_timer = 0
+        self.game_over = False
+        self.won = False
+        self.ticks = 0
+        if not self.create_food():
+            self.game_over = True
+            self.won = True
+
+    def set_snake(self, cells):
+        # Голова - первый элемент
+        self.snake = SnakeBody(self.cols, list(cells))
+        self.rebuild_occupancy()
+
+    def bodies(self):
+        # Тела змеек на поле (у арены их много)
+        return (self.snake,)
+
+    def rebuild_occupancy(self):
+        self.occupied = bytearray(self.cols * self.rows)
+        cells = set()
+        for body in self.bodies():
+            for i in body.indices():
+                self.occupied[i] += 1
+                cells.add(i)
+        # Свободные клетки идут по возрастанию; массивы собираются кусками
+        # между клетками змейки, без цикла по всему полю (поле 2000x2000)
+        size = len(self.occupied)
+        numbers = ramp(size)
+        self.free_cells = array('i')
+        self.free_pos = array('i', [-1]) * size
+        start = 0
+        for i in sorted(cells) + [size]:
+            if i > start:
+                count = len(self.free_cells)
+                self.free_pos[start:i] = numbers[count:count + i - start]
+                self.free_cells.extend(numbers[start:i])
+            start = i + 1
+
+    def occupy(self, i):
+        self.occupied[i] += 1
+        if self.occupied[i] == 1:
+            # Убираем клетку из свободных: на ее место ставим последнюю
+            pos = self.free_pos[i]
+            last = self.free_cells.pop()
+            if last != i:
+                self.free_cells[pos] = last
+                self.free_pos[last] = pos
+            self.free_pos[i] = -1
+
+    def vacate(self, i):
+        self.occupied[i] -= 1
+        if not self.occupied[i]:
+            self.free_pos[i] = len(self.free_cells)
+            self.free_cells.append(i)
+
+    def is_occupied(self, cell):
+        x, y = cell
+        return self.occupied[y * self.cols + x] > 0
+
+    def in_bounds(self, cell):
+        x, y = cell
+        return 0 <= x < self.cols and 0 <= y < self.rows
+
+    def turn(self, direction):
+        # Разворот на 180 градусов запрещен
+        current_dx, current_dy = self.direction
+        new_dx, new_dy = direction
+        if current_dx == -new_dx and current_dy == -new_dy:
+            return False
+        self.direction = direction
+        return True
+
+    def uniform(self):
+        # Пачка дает ту же последовательность, что и вызовы по одному
+        if not self.rng_batch:
+            return self.rng.random()
+        if not self.random_pool:
+            rand = self.rng.random
+            self.random_pool = [rand() for _ in range(self.rng_batch)]
+            self.random_pool.reverse()
+        return self.random_pool.pop()
+
+    def cell_at(self, i):
+        y, x = divmod(i, self.cols)
+        return (x, y)
+
+    def create_food(self):
+        # Возвращает False, если свободных клеток не осталось
+        free_count = len(self.free_cells)
+        if not free_count:
+            self.food = None
+            return False
+        food = self.free_cells[int(self.uniform() * free_count)]
+        self.food = self.cell_at(food)
+        # Случайно создаем специальную еду
+        if self.uniform() < self.special_food_chance and free_count > 1:
+            # Выбираем среди свободных клеток, кроме клетки обычной еды
+            i = self.free_cells[int(self.uniform() * (free_count - 1))]
+            if i == food:
+                i = self.free_cells[free_count - 1]
+            self.special_food = self.cell_at(i)
+            self.special_food_timer = self.special_food_time
+        return True
+
+    def step(self, action=None, dt=None):
+        if self.game_over:
+            return DEATH
+        if dt is None:
+            dt = self.tick
+        if action is not None:
+            self.turn(action)
+        self.ticks += 1
+
+        # Обновляем таймеры
+        if self.special_food:
+            self.special_food_timer -= dt
+            if self.special_food_timer <= 0:
+                self.special_food = None
+
+        if self.invincible:
+            self.invincible_timer -= dt
+            if self.invincible_timer <= 0:
+                self.invincible = False
+
+        # Двигаем змейку; клетки - индексы y * cols + x, без кортежей
+        cols = self.cols
+        snake = self.snake
+        head_y, head_x = divmod(snake.head(), cols)
+        dx, dy = self.direction
+        x = head_x + dx
+        y = head_y + dy
+
+        if self.invincible:
+            # Неуязвимая змейка проходит сквозь стены
+            x %= cols
+            y %= self.rows
+        else:
+            profiler = self.profiler
+            if profiler:
+                started = time.perf_counter()
+            collided = (not (0 <= x < cols and 0 <= y < self.rows)
+                        or self.occupied[y * cols + x] > 0)
+            if profiler:
+                profiler.add('collision', time.perf_counter() - started)
+            if collided:
+                self.game_over = True
+                return DEATH
+
+        new_head = y * cols + x
+        snake.push(new_head)
+        self.occupy(new_head)
+
+        # Проверяем сбор еды
+        food = self.food
+        if food and x == food[0] and y == food[1]:
+            self.score += FOOD_POINTS * self.score_multiplier
+            if self.profiler:
+                started = time.perf_counter()
+                created = self.create_food()
+                self.profiler.add('spawn', time.perf_counter() - started)
+            else:
+                created = self.create_food()
+            if not created:
+                # Поле заполнено - раунд заканчивается
+                self.game_over = True
+                self.won = True
+                return WIN
+            return FOOD
+        special = self.special_food
+        if special and x == special[0] and y == special[1]:
+            self.score += SPECIAL_POINTS * self.score_multiplier
+            self.invincible = True
+            self.invincible_timer = self.invincible_time
+            self.score_multiplier = INVINCIBLE_MULTIPLIER
+            self.special_food = None
+            return SPECIAL
+
+        self.vacate(snake.pop())
+        return MOVE
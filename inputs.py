@@ -0,0 +1,50 @@
+from collections import deque
+
+# Сколько поворотов можно нажать наперед
+INPUT_QUEUE_SIZE = 3
+
+
+def is_reverse(direction, other):
+    return direction[0] == -other[0] and direction[1] == -other[1]
+
+
+class InputQueue:
+    """Очередь поворотов игрока: не больше одного поворота за тик.
+
+    Нажатия не меняют направление сразу, а встают в очередь вместе со
+    временем нажатия. Новое нажатие сверяется с последним поворотом в
+    очереди (или с текущим направлением), поэтому два быстрых нажатия
+    за один тик дают два поворота на двух тиках, а не разворот в себя.
+    take() на тике еще раз сверяет поворот с направлением, которое
+    действительно применилось. Лишние нажатия сверх size отбрасываются.
+    """
+
+    def __init__(self, size=INPUT_QUEUE_SIZE):
+        self.pending = deque()
+        self.size = size
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def clear(self):
+        self.pending.clear()
+
+    def push(self, direction, when, current):
+        last = self.pending[-1][0] if self.pending else current
+        if direction == last or is_reverse(direction, last):
+            return False
+        if len(self.pending) >= self.size:
+            self.dropped += 1
+            return False
+        self.pending.append((direction, when))
+        return True
+
+    def take(self, current):
+        # Первый поворот, допустимый от текущего направления: (направление, время) или None
+        while self.pending:
+            direction, when = self.pending.popleft()
+            if direction != current and not is_reverse(direction, current):
+                return direction, when
+            self.dropped += 1
+        return None
@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from client import RemoteArena
+from engine import DIRECTIONS, DEATH, DEFAULT_TICK
+from profiler import percentile
+from server import GameServer, encode, ROOM_BOTS
+
+
+async def play(host, port, room, seed, stats, mirrors, stop):
+    # Один клиент: входит в комнату, крутит змейку и после смерти входит снова
+    rng = random.Random(seed)
+    while not stop.is_set():
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(encode({'join': room}))
+        welcome = json.loads(await reader.readline())
+        if 'error' in welcome:
+            writer.close()
+            return
+        arena = RemoteArena(welcome, lambda message: writer.write(encode(message)))
+        mirrors[seed] = (room, arena)
+        try:
+            async for line in reader:
+                stats['bytes'] += len(line)
+                stats['messages'] += 1
+                if arena.apply(json.loads(line)) == DEATH:
+                    stats['deaths'] += 1
+                    break
+                if rng.random() < 0.2:
+                    arena.turn(rng.choice(DIRECTIONS))
+        finally:
+            mirrors.pop(seed, None)
+            writer.close()
+
+
+def compare(server, mirrors):
+    # Сколько копий на клиентах разошлись с сервером
+    wrong = 0
+    for room_name, arena in mirrors.values():
+        room = server.rooms.get(room_name)
+        if room is None or arena.ticks != room.engine.ticks:
+            continue
+        # Сверяем с состоянием на последнем тике: вошедших после него клиенты еще не видели
+        bodies = {snake_id: list(body.indices()) for snake_id, (body, _) in room.bodies.items()}
+        mirror = {snake_id: list(snake.snake.indices())
+                  for snake_id, snake in arena.snakes.items()}
+        occupied = bytearray(len(arena.occupied))
+        for cells in bodies.values():
+            for i in cells:
+                occupied[i] += 1
+        if bodies != mirror or arena.occupied != occupied or set(arena.food_kind) != room.foods:
+            wrong += 1
+    return wrong
+
+
+async def run(args):
+    server = GameServer(args.tick, bots=args.bots)
+    listener = await asyncio.start_server(server.handle, '127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    ticker = asyncio.create_task(server.run())
+    stats = {'bytes': 0, 'messages': 0, 'deaths': 0}
+    mirrors = {}
+    stop = asyncio.Event()
+    clients = [asyncio.create_task(play('127.0.0.1', port, f'room{n % args.rooms}', n,
+                                        stats, mirrors, stop))
+               for n in range(args.rooms * args.clients)]
+    await asyncio.sleep(args.seconds)
+
+    # Останавливаем входы и тики и ждем, пока клиенты дочитают последние дельты
+    stop.set()
+    ticker.cancel()
+    await asyncio.sleep(min(1.0, args.tick * 5))
+    wrong = compare(server, mirrors)
+    checked = len(mirrors)
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    # Сервер видит закрытые соединения и убирает игроков
+    while server.rooms:
+        await asyncio.sleep(0.01)
+    listener.close()
+    await listener.wait_closed()
+
+    ticks = len(server.tick_times)
+    times = list(server.tick_times)
+    per_client = stats['bytes'] / max(1, stats['messages'])
+    print(f'комнат: {args.rooms}, клиентов: {args.rooms * args.clients}, '
+          f'ботов в комнате: {args.bots}, тиков: {ticks}')
+    print(f'тик всех комнат: p50 {percentile(times, 0.5) * 1000:.2f} мс, '
+          f'p99 {percentile(times, 0.99) * 1000:.2f} мс, бюджет {args.tick * 1000:.0f} мс')
+    print(f'байт на клиента за тик: {per_client:.0f}, '
+          f'всего отправлено: {server.sent / 1024:.0f} КБ, смертей: {stats["deaths"]}')
+    print(f'копии клиентов совпали с сервером: {checked - wrong} из {checked}')
+    return 1 if wrong else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест сервера через localhost')
+    parser.add_argument('--rooms', type=int, default=200)
+    parser.add_argument('--clients', type=int, default=2, help='игроков в комнате')
+    parser.add_argument('--bots', type=int, default=ROOM_BOTS)
+    parser.add_argument('--tick', type=float, default=DEFAULT_TICK)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
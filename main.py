@@ -1,16 +1,54 @@
+import sys
+import os
+
+# Пакетный прогон без окна (batch.py). Kivy разбирает sys.argv при импорте,
+# поэтому --headless обрабатывается до импорта kivy. batch.py запускается
+# главным модулем: процессы пула (spawn, forkserver) импортируют заново
+# его, а не этот файл с Kivy
+if __name__ == '__main__' and '--headless' in sys.argv:
+    import runpy
+    runpy.run_module('batch', run_name='__main__', alter_sys=True)
+    sys.exit(0)
+# Свои флаги (--server) Kivy не знает, поэтому его разбор аргументов отключается
+if __name__ == '__main__' and any(arg.startswith('--server') for arg in sys.argv):
+    os.environ['KIVY_NO_ARGS'] = '1'
+
 from kivy.app import App
 from kivy.uix.widget import Widget
 from kivy.uix.label import Label
 from kivy.uix.button import Button
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.slider import Slider
-from kivy.graphics import Color, Rectangle, Ellipse, Line
+from kivy.graphics import (Color, Rectangle, Ellipse, Line, InstructionGroup,
+                           PushMatrix, PopMatrix, Scale, Translate)
 from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.properties import NumericProperty, BooleanProperty
 from kivy.core.audio import SoundLoader
+from kivy.metrics import dp
+import argparse
 import random
-import json
-import os
+import time
+from collections import deque
+
+from arena import ArenaEngine
+from assets import Assets, EAT_SOUND, GAME_OVER_SOUND
+from mixer import Mixer
+from client import RemoteArena, NetworkGame, ArenaConnection
+from engine import SnakeEngine, DEATH, FOOD, SPECIAL, WIN
+from render import SnakeMeshRenderer, SnakeViewportRenderer, ArenaRenderer
+from replay import ReplayRecorder, ReplayCursor
+from autopilot import Autopilot
+from profiler import TickProfiler, PHASES
+from storage import Storage
+from inputs import InputQueue
+
+# Сколько тиков логики можно догнать за один кадр после подвисания
+MAX_CATCH_UP_TICKS = 5
+# Размер глаза в долях клетки
+EYE_SIZE = 0.2
+# Поле в режиме большого поля (SnakeApp.huge_board), в клетках
+HUGE_BOARD = (2000, 2000)
 
 class SettingsMenu(BoxLayout):
     def __init__(self, back_callback, **kwargs):
@@ -29,6 +67,7 @@ class SettingsMenu(BoxLayout):
         self.add_widget(speed_label)
         
         self.speed_slider = Slider(min=0.05, max=0.5, value=0.2, step=0.05)
+        self.speed_slider.bind(value=self.change_speed)
         self.add_widget(self.speed_slider)
         
         # Переключатель звука
@@ -49,16 +88,33 @@ class SettingsMenu(BoxLayout):
         back_btn.bind(on_press=self.go_back)
         self.add_widget(back_btn)
     
+    def enter(self):
+        # Экран показывается снова - значения берутся из приложения
+        app = App.get_running_app()
+        self.speed_slider.value = app.game_speed
+        self.sound_btn.text = 'ЗВУК: ВКЛ' if app.sound_enabled else 'ЗВУК: ВЫКЛ'
+    
+    def leave(self):
+        pass
+    
+    def change_speed(self, instance, value):
+        # Сохраняем настройки при изменении
+        app = App.get_running_app()
+        if value != app.game_speed:
+            app.game_speed = value
+            app.save_settings()
+    
     def toggle_sound(self, instance):
         app = App.get_running_app()
         app.sound_enabled = not app.sound_enabled
         instance.text = 'ЗВУК: ВКЛ' if app.sound_enabled else 'ЗВУК: ВЫКЛ'
+        app.save_settings()
     
     def go_back(self, instance):
         self.back_callback()
 
 class MainMenu(BoxLayout):
-    def __init__(self, start_callback, settings_callback, **kwargs):
+    def __init__(self, start_callback, settings_callback, demo_callback=None, **kwargs):
         super().__init__(**kwargs)
         self.orientation = 'vertical'
         self.padding = 50
@@ -66,6 +122,9 @@ class MainMenu(BoxLayout):
         
         self.start_callback = start_callback
         self.settings_callback = settings_callback
+        self.demo_callback = demo_callback
+        # Свой генератор, чтобы не трогать глобальный random
+        self.rng = random.Random()
         
         # Анимация
         self.title = Label(
@@ -97,11 +156,29 @@ class MainMenu(BoxLayout):
         settings_btn.bind(on_press=self.open_settings)
         self.add_widget(settings_btn)
         
+        # Кнопка демо-режима (играет автопилот)
+        if demo_callback:
+            demo_btn = Button(
+                text='ДЕМО',
+                size_hint=(None, None),
+                size=(150, 50),
+                font_size='16sp',
+                background_color=(0.5, 0.5, 0.5, 1)
+            )
+            demo_btn.bind(on_press=self.start_demo)
+            self.add_widget(demo_btn)
+    
+    def enter(self):
+        # Анимация идет, только пока меню на экране
+        Clock.unschedule(self.animate_title)
         Clock.schedule_interval(self.animate_title, 0.5)
     
+    def leave(self):
+        Clock.unschedule(self.animate_title)
+    
     def animate_title(self, dt):
         colors = [(0, 1, 0, 1), (1, 1, 0, 1), (0, 1, 1, 1), (1, 0, 1, 1)]
-        current_color = random.choice(colors)
+        current_color = self.rng.choice(colors)
         self.title.color = current_color
     
     def start_game(self, instance):
@@ -109,9 +186,12 @@ class MainMenu(BoxLayout):
     
     def open_settings(self, instance):
         self.settings_callback()
+    
+    def start_demo(self, instance):
+        self.demo_callback()
 
 class GameOverScreen(BoxLayout):
-    def __init__(self, score, high_score, restart_callback, menu_callback, **kwargs):
+    def __init__(self, restart_callback, menu_callback, **kwargs):
         super().__init__(**kwargs)
         
         self.orientation = 'vertical'
@@ -130,29 +210,27 @@ class GameOverScreen(BoxLayout):
         self.add_widget(title)
         
         # Счет
-        score_label = Label(
-            text=f'Счет: {score}',
+        self.score_label = Label(
+            text='Счет: 0',
             font_size='25sp',
             color=(1, 1, 1, 1)
         )
-        self.add_widget(score_label)
+        self.add_widget(self.score_label)
         
         # Рекорд
-        high_score_label = Label(
-            text=f'Рекорд: {high_score}',
+        self.high_score_label = Label(
+            text='Рекорд: 0',
             font_size='20sp',
             color=(1, 0.5, 0, 1)
         )
-        self.add_widget(high_score_label)
-        
-        # Сообщение о новом рекорде
-        if score == high_score and score > 0:
-            record_label = Label(
-                text='НОВЫЙ РЕКОРД!',
-                font_size='20sp',
-                color=(1, 1, 0, 1)
-            )
-            self.add_widget(record_label)
+        self.add_widget(self.high_score_label)
+        
+        # Сообщение о новом рекорде; на экране, только если рекорд побит
+        self.record_label = Label(
+            text='НОВЫЙ РЕКОРД!',
+            font_size='20sp',
+            color=(1, 1, 0, 1)
+        )
         
         # Кнопка рестарта
         restart_btn = Button(
@@ -176,6 +254,22 @@ class GameOverScreen(BoxLayout):
         menu_btn.bind(on_press=self.go_to_menu)
         self.add_widget(menu_btn)
     
+    def show_result(self, score, high_score):
+        self.score_label.text = f'Счет: {score}'
+        self.high_score_label.text = f'Рекорд: {high_score}'
+        new_record = score == high_score and score > 0
+        if new_record and self.record_label.parent is None:
+            # Под рекордом, над двумя кнопками
+            self.add_widget(self.record_label, index=2)
+        elif not new_record and self.record_label.parent is not None:
+            self.remove_widget(self.record_label)
+    
+    def enter(self):
+        pass
+    
+    def leave(self):
+        pass
+    
     def restart_game(self, instance):
         self.restart_callback()
     
@@ -188,26 +282,41 @@ class SnakeGame(Widget):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         
-        # Игровые переменные
-        self.cell_size = 20
-        self.snake = []
-        self.direction = (1, 0)
-        self.food = None
-        self.special_food = None
-        self.special_food_timer = 0
+        # Игровые переменные. Состояние игры - в клетках; cell_size - размер
+        # клетки, по которому выбирается поле в начале игры, дальше клетки
+        # переводятся в пиксели одним преобразованием field_scale/field_translate
+        self.cell_size = dp(20)
+        self.field_margin = dp(20)
+        self.field_translate = Translate()
+        self.field_scale = Scale()
+        # Центр камеры в клетках; None - поле целиком помещается на экране
+        self.camera = None
+        self.body_view = None
+        self.arena_view = None
+        self.arena_group = None
+        self.engine = None
+        self.recorder = None
+        self.replay_cursor = None
+        self.autopilot = None
+        self.profiler = None
+        self.body_rects = None
+        self.body_group = None
+        self.body_mesh = None
+        self.drawn_tick = 0
+        self.accumulator = 0
+        self.prev_head = None
+        self.prev_tail = None
         self.game_over = False
         self.game_started = False
         self.speed = 0.2
         self.paused = False
-        
-        # Эффекты
-        self.invincible = False
-        self.invincible_timer = 0
-        self.score_multiplier = 1
 
-        self.eat_sound = None
-        self.game_over_sound = None
-        self.load_sounds()
+        # Звуки общие для всех игр и загружаются один раз (SnakeApp.assets)
+        self.eat_sound = EAT_SOUND
+        self.game_over_sound = GAME_OVER_SOUND
+        self.mixer = None  # None - звук выключен
+        # Повороты с касаний; update берет не больше одного за тик
+        self.inputs = InputQueue()
 
         self.create_background_and_border()
 
@@ -227,259 +336,480 @@ class SnakeGame(Widget):
         )
         self.add_widget(self.multiplier_label)
         
+        # Оверлей производительности (SnakeApp.show_perf_hud)
+        self.perf_label = Label(
+            text='',
+            size_hint=(None, None),
+            pos=(10, self.height - 130),
+            color=(0.6, 1, 0.6, 1)
+        )
+        self.add_widget(self.perf_label)
+        
+        self._layout_trigger = Clock.create_trigger(self.apply_layout)
         self.bind(size=self._update, pos=self._update)
     
+    def enter(self):
+        pass
+    
+    def leave(self):
+        # Ушли с экрана игры - ее часы не должны тикать в фоне
+        Clock.unschedule(self.frame)
+        Clock.unschedule(self.update_perf_hud)
+    
+    def set_paused(self, paused):
+        # На паузе часы игры сняты совсем: нет ни тиков, ни перерисовки,
+        # и Kivy не будит процесс ради пустых кадров
+        self.paused = paused
+        self.leave()
+        if not paused and self.game_started and not self.game_over:
+            self.accumulator = 0
+            Clock.schedule_interval(self.frame, 0)
+            if self.profiler:
+                Clock.schedule_interval(self.update_perf_hud, 0.5)
+    
     def create_background_and_border(self):
-        self.canvas.before.clear()
-        
+        # Инструкции создаются один раз, при изменении размера меняется только геометрия
         with self.canvas.before:
             Color(0.1, 0.1, 0.1, 1)
-            Rectangle(pos=self.pos, size=self.size)
+            self.bg_rect = Rectangle()
 
             Color(0.15, 0.15, 0.15, 1)
-            field_margin = 20
-            field_pos = (field_margin, field_margin)
-            field_size = (self.width - 2*field_margin, self.height - 2*field_margin)
-            Rectangle(pos=field_pos, size=field_size)      
+            self.field_rect = Rectangle()
             # Внешняя рамка (толстая)
             Color(0.3, 0.5, 0.8, 1)
-            Line(rectangle=(
-                field_pos[0] - 3, 
-                field_pos[1] - 3, 
-                field_size[0] + 6, 
-                field_size[1] + 6
-            ), width=3)    
+            self.outer_border = Line(width=3)
             # Внутренняя рамка (тонкая)
             Color(0.5, 0.7, 1.0, 1)
-            Line(rectangle=(
-                field_pos[0] - 1, 
-                field_pos[1] - 1, 
-                field_size[0] + 2, 
-                field_size[1] + 2
-            ), width=1)
+            self.inner_border = Line(width=1)
             # Декоративные уголки
-            corner_size = 15
+            self.corners = [Line(width=2) for _ in range(4)]
+        self.layout_background_and_border()
+    
+    def layout_background_and_border(self):
+        self.bg_rect.pos = self.pos
+        self.bg_rect.size = self.size
 
-            Line(points=[
-                field_pos[0], field_pos[1] + corner_size,
-                field_pos[0], field_pos[1],
-                field_pos[0] + corner_size, field_pos[1]
-            ], width=2)
-            
-            Line(points=[
-                field_pos[0] + field_size[0] - corner_size, field_pos[1],
-                field_pos[0] + field_size[0], field_pos[1],
-                field_pos[0] + field_size[0], field_pos[1] + corner_size
-            ], width=2)
-            
-            Line(points=[
-                field_pos[0], field_pos[1] + field_size[1] - corner_size,
-                field_pos[0], field_pos[1] + field_size[1],
-                field_pos[0] + corner_size, field_pos[1] + field_size[1]
-            ], width=2)
-            
-            Line(points=[
-                field_pos[0] + field_size[0] - corner_size, field_pos[1] + field_size[1],
-                field_pos[0] + field_size[0], field_pos[1] + field_size[1],
-                field_pos[0] + field_size[0], field_pos[1] + field_size[1] - corner_size
-            ], width=2)
-    
-    def load_sounds(self):
-        try:
-            self.eat_sound = SoundLoader.load('eat.wav')
-            self.game_over_sound = SoundLoader.load('game_over.wav')
-        except:
-            print("Звуковые файлы не найдены")  
-    def play_sound(self, sound):
-        app = App.get_running_app()
-        if app.sound_enabled and sound:
-            sound.play() 
+        field_x, field_y, scale = self.field_geometry()
+        cols, rows = self.board_size()
+        field_pos = (field_x, field_y)
+        field_size = (cols * scale, rows * scale)
+        self.field_rect.pos = field_pos
+        self.field_rect.size = field_size
+
+        self.outer_border.rectangle = (
+            field_pos[0] - 3, 
+            field_pos[1] - 3, 
+            field_size[0] + 6, 
+            field_size[1] + 6
+        )
+        self.inner_border.rectangle = (
+            field_pos[0] - 1, 
+            field_pos[1] - 1, 
+            field_size[0] + 2, 
+            field_size[1] + 2
+        )
+        corner_size = 15
+
+        self.corners[0].points = [
+            field_pos[0], field_pos[1] + corner_size,
+            field_pos[0], field_pos[1],
+            field_pos[0] + corner_size, field_pos[1]
+        ]
+        
+        self.corners[1].points = [
+            field_pos[0] + field_size[0] - corner_size, field_pos[1],
+            field_pos[0] + field_size[0], field_pos[1],
+            field_pos[0] + field_size[0], field_pos[1] + corner_size
+        ]
+        
+        self.corners[2].points = [
+            field_pos[0], field_pos[1] + field_size[1] - corner_size,
+            field_pos[0], field_pos[1] + field_size[1],
+            field_pos[0] + corner_size, field_pos[1] + field_size[1]
+        ]
+        
+        self.corners[3].points = [
+            field_pos[0] + field_size[0] - corner_size, field_pos[1] + field_size[1],
+            field_pos[0] + field_size[0], field_pos[1] + field_size[1],
+            field_pos[0] + field_size[0], field_pos[1] + field_size[1] - corner_size
+        ]
+    
+    def play_sound(self, name):
+        # Только очередь: звук запускает поток Mixer, тик его не ждет
+        if self.mixer:
+            self.mixer.play(name)
     def _update(self, *args):
-        if hasattr(self, 'bg_rect'):
-            self.bg_rect.pos = self.pos
-            self.bg_rect.size = self.size
-        
+        # Изменения size и pos за кадр собираются в одно обновление
+        self._layout_trigger()
+    def apply_layout(self, *args):
         self.score_label.pos = (10, self.height - 40)
         self.multiplier_label.pos = (10, self.height - 70)  
-        # Обновляем рамку при изменении размера
-        self.create_background_and_border()  
-    def start_game(self):
-        self.snake = [(100, 100)]
-        self.direction = (1, 0)
-        self.score = 0
+        self.perf_label.pos = (10, self.height - 130)
+        self.layout_field()
+    def layout_field(self):
+        # Поле за игру не меняется: при изменении размера и движении камеры
+        # пересчитываются только рамка и преобразование, змейка не перерисовывается
+        self.layout_background_and_border()
+        field_x, field_y, scale = self.field_geometry()
+        self.field_translate.xy = (field_x, field_y)
+        self.field_scale.xyz = (scale, scale, 1)
+        if self.body_view and self.body_rects is not None:
+            self.body_view.update(self.visible_cells())
+            if self.arena_view:
+                self.arena_view.update(self.visible_cells())
+    def follow(self, x, y):
+        # Камера держит клетку (x, y) в центре, но не уходит за край поля
+        cols, rows = self.board_size()
+        half_w = self.width / 2 / self.cell_size
+        half_h = self.height / 2 / self.cell_size
+        x += 0.5
+        y += 0.5
+        x = cols / 2 if cols <= 2 * half_w else min(max(x, half_w), cols - half_w)
+        y = rows / 2 if rows <= 2 * half_h else min(max(y, half_h), rows - half_h)
+        if self.camera != (x, y):
+            self.camera = (x, y)
+            self.layout_field()
+    def visible_cells(self):
+        # Окно камеры в клетках с запасом в клетку для плавного движения
+        field_x, field_y, scale = self.field_geometry()
+        cols, rows = self.board_size()
+        return (max(int((self.x - field_x) // scale) - 1, 0),
+                max(int((self.y - field_y) // scale) - 1, 0),
+                min(int((self.x + self.width - field_x) // scale) + 2, cols),
+                min(int((self.y + self.height - field_y) // scale) + 2, rows))
+    def board_size(self):
+        if self.engine:
+            return self.engine.cols, self.engine.rows
+        return self.field_cells()
+    def field_geometry(self):
+        # Левый нижний угол поля и размер клетки в пикселях. С камерой клетка
+        # камеры стоит в центре виджета, иначе поле вписывается в виджет по центру
+        if self.camera:
+            scale = self.cell_size
+            return (self.x + self.width / 2 - self.camera[0] * scale,
+                    self.y + self.height / 2 - self.camera[1] * scale,
+                    scale)
+        cols, rows = self.board_size()
+        margin = self.field_margin
+        scale = max(min((self.width - 2 * margin) / cols,
+                        (self.height - 2 * margin) / rows), 1)
+        return (self.x + (self.width - cols * scale) / 2,
+                self.y + (self.height - rows * scale) / 2,
+                scale)
+    def field_cells(self):
+        # Размер игрового поля в клетках с учетом отступов рамки
+        cols = int((self.width - 2 * self.field_margin) // self.cell_size)
+        rows = int((self.height - 2 * self.field_margin) // self.cell_size)
+        return max(cols, 1), max(rows, 1)
+    def cell_pos(self, cell):
+        # Клетка в пикселях окна (для касаний); рисуется змейка прямо в клетках
+        field_x, field_y, scale = self.field_geometry()
+        return (field_x + cell[0] * scale, field_y + cell[1] * scale)
+    def start_game(self, replay=None, autopilot=False, network=None):
         self.game_over = False
         self.game_started = True
         self.paused = False
-        self.invincible = False
-        self.score_multiplier = 1
         
-        self.speed = App.get_running_app().game_speed
-        
-        self.create_food()
-        Clock.unschedule(self.update)
-        Clock.schedule_interval(self.update, self.speed)
+        app = App.get_running_app()
+        if replay:
+            # Просмотр записи: ходы берутся из нее, касания не меняют направление
+            self.speed = replay.tick
+            self.engine = replay.new_engine()
+            self.replay_cursor = ReplayCursor(replay)
+            self.recorder = None
+        elif network:
+            # Сетевая игра (уже вошла в комнату): правила на сервере, тик - тоже серверный
+            self.engine = network
+            self.speed = network.tick
+            self.replay_cursor = None
+            self.recorder = None
+        else:
+            self.speed = app.game_speed
+            board = HUGE_BOARD if app.huge_board else self.field_cells()
+            self.replay_cursor = None
+            if app.arena_bots:
+                # Арена с ботами; записи игр пока только для одной змейки
+                self.engine = ArenaEngine(*board, bots=app.arena_bots, tick=self.speed,
+                                          seed=app.game_seed)
+                self.recorder = None
+            else:
+                self.engine = SnakeEngine(*board, tick=self.speed, seed=app.game_seed)
+                self.recorder = ReplayRecorder(self.engine)
+        # Автопилот сам выбирает направление каждый тик
+        self.autopilot = Autopilot() if autopilot and not replay else None
+        # Сид - в лог Kivy, а не в stdout: бенчмарки и тесты запускают много игр
+        Logger.info(f"Snake: сид игры {self.engine.seed}")
+        self.body_rects = None
+        self.accumulator = 0
+        self.prev_head = None
+        self.prev_tail = None
+        self.inputs.clear()
+        # Поле больше экрана - камера следует за головой и рисуется только
+        # видимая часть тела; на арене тела всех змеек рисуются по общей сетке.
+        # Иначе пакетная отрисовка одним Mesh - по настройке
+        fit_cols, fit_rows = self.field_cells()
+        huge = self.engine.cols > fit_cols or self.engine.rows > fit_rows
+        arena = isinstance(self.engine, (ArenaEngine, RemoteArena))
+        self.camera = None
+        self.body_view = None
+        self.body_mesh = None
+        self.arena_view = ArenaRenderer(self) if arena else None
+        if huge or arena:
+            self.body_view = SnakeViewportRenderer(self)
+        elif app.batched_render:
+            self.body_mesh = SnakeMeshRenderer(self)
+        if huge:
+            self.follow(*self.engine.snake[0])
+        # Рамка и преобразование поля - под размер поля этой игры
+        self.apply_layout()
+        self.score = 0
+        self.score_label.text = 'Счет: 0'
+        self.multiplier_label.text = ''
+        Clock.unschedule(self.frame)
+        Clock.schedule_interval(self.frame, 0)
+        
+        Clock.unschedule(self.update_perf_hud)
+        if app.show_perf_hud:
+            self.profiler = TickProfiler()
+            Clock.schedule_interval(self.update_perf_hud, 0.5)
+        else:
+            self.profiler = None
+        self.engine.profiler = self.profiler
+        self.perf_label.text = ''
+        self.mixer = app.mixer if app.sound_enabled else None
         
         self.draw_snake()
         self.draw_food()
     
-    def create_food(self):
-        if not self.game_started:
-            return          
-        # Учитываем отступы рамки при создании еды
-        field_margin = 20
-        max_x = int((self.width - 2 * field_margin) // self.cell_size) - 1
-        max_y = int((self.height - 2 * field_margin) // self.cell_size) - 1
-        
-        while True:
-            x = random.randint(0, max_x) * self.cell_size + field_margin
-            y = random.randint(0, max_y) * self.cell_size + field_margin
-            
-            if (x, y) not in self.snake:
-                self.food = (x, y)
-                break     
-        # Случайно создаем специальную еду
-        if random.random() < 0.3:  # 30% шанс
-            while True:
-                x = random.randint(0, max_x) * self.cell_size + field_margin
-                y = random.randint(0, max_y) * self.cell_size + field_margin
-                
-                if (x, y) not in self.snake and (x, y) != self.food:
-                    self.special_food = (x, y)
-                    self.special_food_timer = 10  # 10 секунд
-                    break
+    def build_snake_graphics(self):
+        # Постоянные инструкции: дальше каждый тик меняются только позиции
+        # Все рисуется в клетках (клетка - квадрат 1x1) внутри преобразования поля
+        self.canvas.after.clear()
+        size = (1, 1)
+        eye_size = EYE_SIZE
+        self.special_food_ellipse = Ellipse(size=(0, 0))
+        self.food_rect = Rectangle(size=(0, 0))
+        self.body_group = InstructionGroup()
+        self.arena_group = InstructionGroup()
+        self.body_rects = deque()
+        self.tail_rect = Rectangle(pos=self.engine.snake[-1], size=size)
+        self.head_color = Color(0, 1, 0, 1)
+        self.head_rect = Rectangle(size=size)
+        self.eyes = [Ellipse(size=(eye_size, eye_size)) for _ in range(2)]
+        for instruction in (PushMatrix(), self.field_translate, self.field_scale,
+                            Color(1, 0.5, 0, 1), self.special_food_ellipse,  # Оранжевый
+                            Color(1, 0, 0, 1), self.food_rect,
+                            Color(0, 0.8, 0, 1), self.body_group, self.tail_rect,
+                            self.arena_group,
+                            self.head_color, self.head_rect,
+                            Color(0, 0, 0, 1), *self.eyes,  # Глаза черного цвета
+                            PopMatrix()):
+            self.canvas.after.add(instruction)
+        # Тело - все сегменты, кроме головы
+        if self.arena_view:
+            self.arena_view.build(self.arena_group)
+        if self.body_view:
+            self.body_view.build(self.body_group)
+        elif self.body_mesh:
+            self.body_mesh.build(self.body_group)
+        else:
+            for i, cell in enumerate(self.engine.snake):
+                if i:
+                    self.add_body_rect(cell, left=False)
+        self.drawn_tick = self.engine.ticks
+    
+    def add_body_rect(self, cell, left=True):
+        rect = Rectangle(pos=cell, size=(1, 1))
+        self.body_group.add(rect)
+        if left:
+            self.body_rects.appendleft(rect)
+        else:
+            self.body_rects.append(rect)
+    
+    def eye_positions(self, x, y, direction):
+        # Определяем положение глаз в зависимости от направления
+        dx, dy = direction
+        eye_size = EYE_SIZE
+        eye_offset = eye_size  # Отступ от края
+        if dx == 1:  # Движение вправо
+            return ((x + 1 - eye_size - eye_offset/2, y + 1 - eye_size*2),
+                    (x + 1 - eye_size - eye_offset/2, y + eye_offset/2))
+        if dx == -1:  # Движение влево
+            return ((x + eye_offset/2, y + 1 - eye_size*2),
+                    (x + eye_offset/2, y + eye_offset/2))
+        if dy == 1:  # Движение вверх
+            return ((x + 1 - eye_size*2, y + 1 - eye_size - eye_offset/2),
+                    (x + eye_offset/2, y + 1 - eye_size - eye_offset/2))
+        # Движение вниз
+        return ((x + 1 - eye_size*2, y + eye_offset/2),
+                (x + eye_offset/2, y + eye_offset/2))
     
     def draw_snake(self):
-        self.canvas.after.clear()   
-        with self.canvas.after:
-            # Рисуем специальную еду
-            if self.special_food:
-                Color(1, 0.5, 0, 1)  # Оранжевый
-                x, y = self.special_food
-                Ellipse(pos=(x, y), size=(self.cell_size, self.cell_size))        
-            # Рисуем обычную еду
-            if self.food:
-                Color(1, 0, 0, 1)
-                x, y = self.food
-                Rectangle(pos=(x, y), size=(self.cell_size, self.cell_size))         
-            # Рисуем змейку
-            for i, (x, y) in enumerate(self.snake):
-                if self.invincible and i == 0:
-                    Color(1, 1, 1, 1) if int(self.invincible_timer * 10) % 2 else Color(0, 1, 0, 1)
-                elif i == 0:
-                    Color(0, 1, 0, 1)
-                else:
-                    Color(0, 0.8, 0, 1)
-                Rectangle(pos=(x, y), size=(self.cell_size, self.cell_size))         
-                # Рисуем глаза только на голове змейки
-                if i == 0:
-                    # Определяем положение глаз в зависимости от направления
-                    dx, dy = self.direction
-                    eye_size = self.cell_size // 5
-                    eye_offset = eye_size  # Отступ от края
-                    
-                    # Глаза черного цвета
-                    Color(0, 0, 0, 1)                    
-                    if dx == 1:  # Движение вправо
-                        # Правый глаз (правый верхний угол)
-                        Ellipse(pos=(x + self.cell_size - eye_size - eye_offset//2, 
-                                   y + self.cell_size - eye_size*2), 
-                               size=(eye_size, eye_size))
-                        # Левый глаз (правый нижний угол)
-                        Ellipse(pos=(x + self.cell_size - eye_size - eye_offset//2, 
-                                   y + eye_offset//2), 
-                               size=(eye_size, eye_size))                    
-                    elif dx == -1:  # Движение влево
-                        # Правый глаз (левый верхний угол)
-                        Ellipse(pos=(x + eye_offset//2, 
-                                   y + self.cell_size - eye_size*2), 
-                               size=(eye_size, eye_size))
-                        # Левый глаз (левый нижний угол)
-                        Ellipse(pos=(x + eye_offset//2, 
-                                   y + eye_offset//2), 
-                               size=(eye_size, eye_size))                 
-                    elif dy == 1:  # Движение вверх
-                        # Правый глаз (правый верхний угол)
-                        Ellipse(pos=(x + self.cell_size - eye_size*2, 
-                                   y + self.cell_size - eye_size - eye_offset//2), 
-                               size=(eye_size, eye_size))
-                        # Левый глаз (левый верхний угол)
-                        Ellipse(pos=(x + eye_offset//2, 
-                                   y + self.cell_size - eye_size - eye_offset//2), 
-                               size=(eye_size, eye_size))                
-                    elif dy == -1:  # Движение вниз
-                        # Правый глаз (правый нижний угол)
-                        Ellipse(pos=(x + self.cell_size - eye_size*2, 
-                                   y + eye_offset//2), 
-                               size=(eye_size, eye_size))
-                        # Левый глаз (левый нижний угол)
-                        Ellipse(pos=(x + eye_offset//2, 
-                                   y + eye_offset//2), 
-                               size=(eye_size, eye_size))
+        engine = self.engine
+        snake = engine.snake
+        if self.body_rects is None or engine.ticks - self.drawn_tick > 1:
+            self.build_snake_graphics()
+        elif engine.ticks != self.drawn_tick and self.body_view:
+            # Видимая часть тела перестраивается при движении камеры
+            self.drawn_tick = engine.ticks
+            if self.camera:
+                self.follow(*snake[0])
+            self.body_view.update(self.visible_cells())
+            if self.arena_view:
+                self.arena_view.update(self.visible_cells())
+        elif engine.ticks != self.drawn_tick and self.body_mesh:
+            self.body_mesh.advance()
+            self.drawn_tick = engine.ticks
+        elif engine.ticks != self.drawn_tick:
+            # Змейка сдвинулась на одну клетку: бывшая голова становится телом
+            body_len = len(snake) - 1
+            if body_len > len(self.body_rects):
+                self.add_body_rect(snake[1])
+            elif body_len:
+                # Прямоугольник хвоста переезжает на место бывшей головы
+                rect = self.body_rects.pop()
+                rect.pos = snake[1]
+                self.body_rects.appendleft(rect)
+            self.drawn_tick = engine.ticks
+        # Голова
+        x, y = snake[0]
+        self.head_rect.pos = (x, y)
+        if engine.invincible and int(engine.invincible_timer * 10) % 2:
+            self.head_color.rgba = (1, 1, 1, 1)
+        else:
+            self.head_color.rgba = (0, 1, 0, 1)
+        for eye, pos in zip(self.eyes, self.eye_positions(x, y, engine.direction)):
+            eye.pos = pos
+        # Еда
+        size = (1, 1)
+        if engine.food:
+            self.food_rect.pos = engine.food
+            self.food_rect.size = size
+        else:
+            self.food_rect.size = (0, 0)
+        if engine.special_food:
+            self.special_food_ellipse.pos = engine.special_food
+            self.special_food_ellipse.size = size
+        else:
+            self.special_food_ellipse.size = (0, 0)
     
     def draw_food(self):
         pass   
+    def lerp_cell(self, start, end, alpha):
+        # Позиция между клетками; скачки через стену не сглаживаются
+        end_x, end_y = end
+        if start is None or abs(start[0] - end[0]) + abs(start[1] - end[1]) != 1:
+            return (end_x, end_y)
+        start_x, start_y = start
+        return (start_x + (end_x - start_x) * alpha,
+                start_y + (end_y - start_y) * alpha)
+    
+    def interpolate(self, alpha):
+        # Голова и хвост плавно движутся между тиками логики
+        engine = self.engine
+        x, y = self.lerp_cell(self.prev_head, engine.snake[0], alpha)
+        if self.camera:
+            self.follow(x, y)
+        self.head_rect.pos = (x, y)
+        for eye, pos in zip(self.eyes, self.eye_positions(x, y, engine.direction)):
+            eye.pos = pos
+        self.tail_rect.pos = self.lerp_cell(self.prev_tail, engine.snake[-1], alpha)
+    
+    def frame(self, dt):
+        # Логика тикает с фиксированным шагом speed, отрисовка - каждый кадр
+        if self.game_over or not self.game_started or self.paused:
+            return
+        self.accumulator = min(self.accumulator + dt, self.speed * MAX_CATCH_UP_TICKS)
+        while self.accumulator >= self.speed and not self.game_over:
+            self.accumulator -= self.speed
+            self.update(self.speed)
+        if not self.game_over:
+            self.interpolate(self.accumulator / self.speed)
+    
     def update(self, dt):
         if self.game_over or not self.game_started or self.paused:
             return    
-        # Обновляем таймеры
-        if self.special_food:
-            self.special_food_timer -= dt
-            if self.special_food_timer <= 0:
-                self.special_food = None
-        
-        if self.invincible:
-            self.invincible_timer -= dt
-            if self.invincible_timer <= 0:
-                self.invincible = False
-                self.multiplier_label.text = ''    
-        # Двигаем змейку
-        head_x, head_y = self.snake[0]
-        dx, dy = self.direction
-        new_head = (head_x + dx * self.cell_size, head_y + dy * self.cell_size)       
-        # Проверяем столкновения с учетом рамки
-        field_margin = 20
-        if not self.invincible:
-            if (new_head[0] < field_margin or new_head[0] >= self.width - field_margin or 
-                new_head[1] < field_margin or new_head[1] >= self.height - field_margin):
-                self.end_game()
-                return
-            
-            if new_head in self.snake:
-                self.end_game()
-                return      
-        self.snake.insert(0, new_head)       
-        # Проверяем сбор еды
-        points_earned = 0
-        
-        if new_head == self.food:
-            points_earned = 1 * self.score_multiplier
-            self.score += points_earned
-            self.play_sound(self.eat_sound)
-            self.create_food()
-        elif self.special_food and new_head == self.special_food:
-            points_earned = 5 * self.score_multiplier
-            self.score += points_earned
-            self.invincible = True
-            self.invincible_timer = 5  # 5 секунд неуязвимости
-            self.score_multiplier = 2
-            self.multiplier_label.text = f'x{self.score_multiplier}'
-            self.special_food = None
+        # Вся логика тика - в SnakeEngine
+        self.prev_head = self.engine.snake[0]
+        self.prev_tail = self.engine.snake[-1]
+        if self.replay_cursor:
+            self.replay_cursor.apply(self.engine)
+        if self.autopilot:
+            self.engine.turn(self.autopilot.choose(self.engine))
+        pressed = self.inputs.take(self.engine.direction)
+        if pressed:
+            self.engine.turn(pressed[0])
+        if self.recorder:
+            self.recorder.record(self.engine)
+        profiler = self.profiler
+        if profiler:
+            profiler.begin_tick(self.engine.ticks)
+            started = time.perf_counter()
+        event = self.engine.step(dt=dt)
+        if profiler:
+            finished = time.perf_counter()
+            profiler.add('update', finished - started)
+            if pressed:
+                # От касания до хода, в котором поворот применился
+                profiler.add_latency(finished - pressed[1])
+        if event in (DEATH, WIN):
+            self.end_game()
+            return
+        if event in (FOOD, SPECIAL):
             self.play_sound(self.eat_sound)
-        else:
-            self.snake.pop()
         
+        self.score = self.engine.score
         self.score_label.text = f'Счет: {self.score}'
-        self.draw_snake()
+        if self.engine.invincible:
+            self.multiplier_label.text = f'x{self.engine.score_multiplier}'
+        else:
+            self.multiplier_label.text = ''
+        if profiler:
+            started = time.perf_counter()
+            self.draw_snake()
+            profiler.add('draw', time.perf_counter() - started)
+            profiler.end_tick(instructions=self.instruction_count())
+        else:
+            self.draw_snake()
+    
+    def instruction_count(self):
+        count = len(self.canvas.before.children) + len(self.canvas.after.children)
+        for group in (self.body_group, self.arena_group):
+            if group is not None:
+                count += len(group.children)
+        return count
+    
+    def update_perf_hud(self, dt):
+        summary = self.profiler.summary()
+        lines = [f'{summary["tick_rate"]:.1f} тик/с']
+        for phase in PHASES:
+            p50, p99 = summary[phase]
+            lines.append(f'{phase}: {p50 * 1000:.2f} / {p99 * 1000:.2f} мс')
+        p50, p99 = summary['input']
+        lines.append(f'ввод: {p50 * 1000:.0f} / {p99 * 1000:.0f} мс')
+        lines.append(f'инструкций: {self.instruction_count()}')
+        self.perf_label.text = '\n'.join(lines)
     
     def end_game(self):
         self.game_over = True
         self.game_started = False
-        Clock.unschedule(self.update)
+        Clock.unschedule(self.frame)
+        Clock.unschedule(self.update_perf_hud)
         self.play_sound(self.game_over_sound)
         
-        # Сохраняем рекорд
+        if isinstance(self.engine, NetworkGame):
+            self.engine.close()
+        
         app = App.get_running_app()
-        if self.score > app.high_score:
+        # Трасса тиков для разбора подвисаний; пишется в фоне, как рекорд
+        if self.profiler:
+            app.storage.save('perf_trace.json', self.profiler.trace())
+        if self.recorder:
+            app.last_replay = self.recorder.finish(self.engine)
+            app.save_last_replay()
+        
+        # Сохраняем рекорд
+        if self.score > app.high_score and not self.replay_cursor and not self.autopilot:
             app.high_score = self.score
             app.save_high_score()
         
@@ -491,13 +821,13 @@ class SnakeGame(Widget):
         
         # Пауза по двойному нажатию
         if touch.is_double_tap:
-            self.paused = not self.paused
+            self.set_paused(not self.paused)
             return
         
-        if self.paused:
+        if self.paused or self.replay_cursor or self.autopilot:
             return
         
-        head_x, head_y = self.snake[0]
+        head_x, head_y = self.cell_pos(self.engine.snake[0])
         touch_x, touch_y = touch.pos
         
         dx = touch_x - head_x
@@ -508,11 +838,8 @@ class SnakeGame(Widget):
         else:
             new_direction = (0, 1 if dy > 0 else -1)
         
-        current_dx, current_dy = self.direction
-        new_dx, new_dy = new_direction
-        
-        if not (current_dx == -new_dx and current_dy == -new_dy):
-            self.direction = new_direction
+        # Поворот применится на ближайшем тике (update)
+        self.inputs.push(new_direction, time.perf_counter(), self.engine.direction)
 
 class SnakeApp(App):
     def __init__(self, **kwargs):
@@ -520,57 +847,148 @@ class SnakeApp(App):
         self.high_score = 0
         self.game_speed = 0.2
         self.sound_enabled = True
+        self.batched_render = False
+        self.game_seed = None  # None - новый сид в каждой игре
+        self.last_replay = None
+        self.show_perf_hud = False
+        self.huge_board = False  # поле HUGE_BOARD с камерой вместо поля по размеру окна
+        self.arena_bots = 0  # больше 0 - арена с таким числом ботов
+        self.server_address = None  # "хост:порт" - сетевая игра на сервере (server.py)
+        self.server_room = 'main'
+        self.connection = None  # ArenaConnection, пока идет вход в комнату
+        # Файлы пишутся в фоне, чтобы конец игры не ждал диска
+        self.storage = Storage()
+        self.assets = Assets(SoundLoader)
+        self.mixer = Mixer(self.assets)
+        # Экраны строятся один раз и переиспользуются (show_screen)
+        self.screens = {}
+        self.screen = None
         self.load_high_score()
+        self.load_settings()
     
     def build(self):
+        # Звуки грузятся в фоне, пока открыто меню
+        self.assets.preload()
         self.root = BoxLayout(orientation='vertical')
         self.show_menu()
         return self.root
     
     def load_high_score(self):
+        data = self.storage.load_json('high_score.json', {})
         try:
-            if os.path.exists('high_score.json'):
-                with open('high_score.json', 'r') as f:
-                    data = json.load(f)
-                    self.high_score = data.get('high_score', 0)
+            self.high_score = int(data.get('high_score', 0))
         except:
             self.high_score = 0    
     def save_high_score(self):
+        self.storage.save_json('high_score.json', {'high_score': self.high_score})
+    def load_settings(self):
+        data = self.storage.load_json('settings.json', {})
         try:
-            with open('high_score.json', 'w') as f:
-                json.dump({'high_score': self.high_score}, f)
+            self.game_speed = float(data.get('game_speed', self.game_speed))
+            self.sound_enabled = bool(data.get('sound_enabled', self.sound_enabled))
         except:
             pass    
+    def save_settings(self):
+        self.storage.save_json('settings.json', {'game_speed': self.game_speed,
+                                                 'sound_enabled': self.sound_enabled})
+    def save_last_replay(self):
+        self.storage.save('last_replay.snkr', self.last_replay.to_bytes())
+    def on_pause(self):
+        # Приложение свернуто: игра встает на паузу, часы экрана снимаются
+        if isinstance(self.screen, SnakeGame) and self.screen.game_started:
+            self.screen.set_paused(True)
+        if self.screen is not None:
+            self.screen.leave()
+        self.storage.flush(timeout=2)
+        return True
+    def on_resume(self):
+        # Игра остается на паузе до двойного нажатия, меню снова анимируется
+        if self.screen is not None:
+            self.screen.enter()
+    def on_stop(self):
+        # Дописываем отложенные файлы перед выходом
+        self.storage.flush(timeout=2)
+        self.mixer.close()
+    def get_screen(self, name, create):
+        if name not in self.screens:
+            self.screens[name] = create()
+        return self.screens[name]
+    def show_screen(self, screen):
+        # Уходящий экран останавливает свои часы, новый - запускает
+        if self.screen is not screen:
+            if self.screen is not None:
+                self.screen.leave()
+            self.root.clear_widgets()
+            self.root.add_widget(screen)
+            self.screen = screen
+        screen.enter()
+        return screen
     def show_menu(self):
-        self.root.clear_widgets()
-        menu = MainMenu(
+        self.show_screen(self.get_screen('menu', lambda: MainMenu(
             start_callback=self.start_game,
-            settings_callback=self.show_settings
-        )
-        self.root.add_widget(menu)    
+            settings_callback=self.show_settings,
+            demo_callback=self.start_demo
+        )))
     def show_settings(self):
-        self.root.clear_widgets()
-        settings = SettingsMenu(back_callback=self.show_menu)
-        settings.speed_slider.value = self.game_speed
-        settings.sound_btn.text = 'ЗВУК: ВКЛ' if self.sound_enabled else 'ЗВУК: ВЫКЛ'
-        self.root.add_widget(settings)        
-        # Сохраняем настройки при изменении
-        def on_speed_change(instance, value):
-            self.game_speed = value
-        settings.speed_slider.bind(value=on_speed_change)    
-    def start_game(self):
-        self.root.clear_widgets()
-        game = SnakeGame()
-        game.start_game()
-        self.root.add_widget(game)    
+        self.show_screen(self.get_screen('settings', lambda: SettingsMenu(
+            back_callback=self.show_menu
+        )))
+    def start_game(self, replay=None, autopilot=False, network=None):
+        if self.server_address and not replay and not network:
+            self.connect(autopilot)
+            return
+        game = self.get_screen('game', lambda: SnakeGame(size=self.root.size))
+        # Игра получает размер корня сразу, чтобы поле создалось нужного размера
+        game.size = self.root.size
+        game.start_game(replay, autopilot, network)
+        self.show_screen(game)
+    def connect(self, autopilot=False):
+        # Вход в комнату идет в потоке соединения; игра открывается из Clock,
+        # когда пришла своя змейка, и меню все это время отвечает
+        if self.connection is not None:
+            return
+        host, port = self.server_address.rsplit(':', 1)
+        def ready(network):
+            Clock.schedule_once(lambda dt: self.network_ready(network, autopilot))
+        def failed(error):
+            Clock.schedule_once(lambda dt: self.network_failed(error))
+        self.connection = ArenaConnection(host, int(port), self.server_room, ready, failed)
+    def network_ready(self, network, autopilot):
+        self.connection = None
+        self.start_game(autopilot=autopilot, network=network)
+    def network_failed(self, error):
+        # Сервер недоступен - остаемся в меню
+        self.connection = None
+        print(f"Нет связи с сервером: {error}")
+        self.show_menu()
+    def start_demo(self):
+        self.start_game(autopilot=True)
     def show_game_over(self, score):
-        self.root.clear_widgets()
-        game_over = GameOverScreen(
-            score=score,
-            high_score=self.high_score,
+        game_over = self.get_screen('game_over', lambda: GameOverScreen(
             restart_callback=self.start_game,
             menu_callback=self.show_menu
-        )
-        self.root.add_widget(game_over)
+        ))
+        game_over.show_result(score, self.high_score)
+        self.show_screen(game_over)
+def server_address(text):
+    host, _, port = text.rpartition(':')
+    if not host or not port.isdigit():
+        raise argparse.ArgumentTypeError('нужен адрес вида хост:порт')
+    return text
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Змейка')
+    parser.add_argument('--server', type=server_address,
+                        help='хост:порт сервера (server.py) - сетевая игра')
+    parser.add_argument('--room', default='main', help='комната на сервере')
+    # Остальные аргументы - для Kivy
+    return parser.parse_known_args(argv)[0]
+
+
 if __name__ == '__main__':
-    SnakeApp().run()
+    args = parse_args(sys.argv[1:])
+    app = SnakeApp()
+    app.server_address = args.server
+    app.server_room = args.room
+    app.run()
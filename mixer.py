@@ -0,0 +1,70 @@
+import queue
+import threading
+
+# Сколько звуков может звучать одновременно; лишние пропускаются
+MAX_VOICES = 4
+
+
+class Mixer:
+    """Проигрывание звуков вне тика игры.
+
+    play() только кладет имя звука в очередь. Фоновый поток берет для
+    него свободный голос из пула Assets.voices (по кругу), поэтому еда
+    на соседних тиках не перезапускает один и тот же Sound. Если все
+    голоса звука заняты или уже звучат max_voices звуков, звук
+    пропускается.
+    """
+
+    def __init__(self, assets, max_voices=MAX_VOICES):
+        self.assets = assets
+        self.max_voices = max_voices
+        self.requests = queue.SimpleQueue()
+        self.next_voice = {}  # имя звука -> с какого голоса искать свободный
+        self.played = 0
+        self.dropped = 0
+        self.thread = None
+
+    def play(self, name):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        self.requests.put(name)
+
+    def run(self):
+        while True:
+            name = self.requests.get()
+            if name is None:
+                return
+            self.start_voice(name)
+
+    def playing(self):
+        return sum(voice.state == 'play'
+                   for voices in list(self.assets.sounds.values()) for voice in voices)
+
+    def start_voice(self, name):
+        voices = self.assets.voices(name)
+        if not voices:
+            return False
+        if self.playing() >= self.max_voices:
+            self.dropped += 1
+            return False
+        first = self.next_voice.get(name, 0)
+        for shift in range(len(voices)):
+            number = (first + shift) % len(voices)
+            voice = voices[number]
+            if voice.state != 'play':
+                self.next_voice[name] = number + 1
+                try:
+                    voice.play()
+                except:
+                    pass
+                self.played += 1
+                return True
+        self.dropped += 1
+        return False
+
+    def close(self):
+        if self.thread is not None:
+            self.requests.put(None)
+            self.thread.join(1)
+            self.thread = None
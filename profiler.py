@@ -0,0 +1,75 @@
+import json
+import time
+from collections import deque
+
+# Фазы тика: update - весь шаг движка, collision и spawn - его части, draw - отрисовка
+PHASES = ('update', 'collision', 'spawn', 'draw')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class TickProfiler:
+    """Время фаз по тикам в кольцевом буфере из size последних записей.
+
+    Отдельно хранится задержка ввода: от нажатия до хода змейки.
+    """
+
+    def __init__(self, size=1000):
+        self.records = deque(maxlen=size)
+        self.latencies = deque(maxlen=size)
+        self.current = None
+
+    def begin_tick(self, tick):
+        self.current = {'tick': tick, 'time': time.perf_counter()}
+        for phase in PHASES:
+            self.current[phase] = 0.0
+
+    def add(self, phase, seconds):
+        if self.current is not None:
+            self.current[phase] += seconds
+
+    def add_latency(self, seconds):
+        self.latencies.append(seconds)
+        if self.current is not None:
+            self.current['input_latency'] = seconds
+
+    def end_tick(self, **extra):
+        if self.current is None:
+            return
+        self.current.update(extra)
+        self.records.append(self.current)
+        self.current = None
+
+    def tick_rate(self, window=1.0):
+        # Сколько тиков пришлось на последние window секунд
+        if not self.records:
+            return 0
+        now = time.perf_counter()
+        count = 0
+        for record in reversed(self.records):
+            if now - record['time'] > window:
+                break
+            count += 1
+        return count / window
+
+    def summary(self):
+        result = {'tick_rate': self.tick_rate()}
+        for phase in PHASES:
+            values = [record[phase] for record in self.records]
+            result[phase] = (percentile(values, 0.5), percentile(values, 0.99))
+        latencies = list(self.latencies)
+        result['input'] = (percentile(latencies, 0.5), percentile(latencies, 0.99))
+        return result
+
+    def trace(self):
+        # Трасса в JSON, байтами - для записи в фоне (Storage.save)
+        return json.dumps(list(self.records)).encode()
+
+    def export_trace(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.trace())
@@ -0,0 +1,217 @@
+from collections import deque
+
+from kivy.graphics import Color, Mesh
+
+from engine import FOOD
+
+# Квадов в одной сетке. Kivy при каждом присвоении vertices переводит и
+# загружает весь массив сетки, поэтому сетки маленькие: тик загружает
+# заново одну сетку, а не все тело. Предел индексов unsigned short - 16383
+QUADS_PER_MESH = 256
+FLOATS_PER_QUAD = 16  # 4 вершины по (x, y, u, v)
+
+QUAD_INDICES = []
+for _i in range(QUADS_PER_MESH):
+    _v = _i * 4
+    QUAD_INDICES.extend((_v, _v + 1, _v + 2, _v + 2, _v + 3, _v))
+
+
+class SnakeMeshRenderer:
+    """Рисует тело змейки пакетами: сегменты в сетках Mesh по QUADS_PER_MESH.
+
+    Каждому сегменту тела соответствует слот - квад в массиве вершин.
+    Как и прямоугольники в SnakeGame.draw_snake, слот хвоста переезжает
+    на место бывшей головы. Меняется один квад, но сетка загружается
+    целиком, поэтому тик стоит QUADS_PER_MESH * 16 чисел (при росте -
+    еще одна сетка), а инструкций - одна на QUADS_PER_MESH сегментов.
+    Тело одного цвета, поэтому цвет задает общая инструкция Color перед
+    группой: стандартный шейдер Kivy не читает цвет из вершин.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.group = None
+        self.slots = None
+
+    def build(self, group):
+        self.group = group
+        self.meshes = []
+        self.chunks = []
+        self.quads = []
+        self.dirty = set()
+        self.slots = deque()
+        for i, cell in enumerate(self.game.engine.snake):
+            if i:
+                self.slots.append(self.new_slot(cell))
+        self.flush()
+
+    def new_slot(self, cell):
+        # Слоты только добавляются: змейка за игру не укорачивается
+        slot = len(self.slots)
+        chunk = slot // QUADS_PER_MESH
+        if chunk == len(self.chunks):
+            mesh = Mesh(mode='triangles')
+            self.group.add(mesh)
+            self.meshes.append(mesh)
+            self.chunks.append([])
+            self.quads.append(0)
+        self.chunks[chunk].extend([0] * FLOATS_PER_QUAD)
+        self.write(slot, cell)
+        return slot
+
+    def write(self, slot, cell):
+        chunk, local = divmod(slot, QUADS_PER_MESH)
+        # Квад 1x1 в клетках: в пиксели его переводит преобразование поля
+        x, y = cell
+        offset = local * FLOATS_PER_QUAD
+        self.chunks[chunk][offset:offset + FLOATS_PER_QUAD] = (
+            x, y, 0, 0,
+            x + 1, y, 1, 0,
+            x + 1, y + 1, 1, 1,
+            x, y + 1, 0, 1,
+        )
+        self.dirty.add(chunk)
+
+    def advance(self):
+        # Змейка сдвинулась на одну клетку: бывшая голова становится телом
+        snake = self.game.engine.snake
+        if len(snake) - 1 > len(self.slots):
+            self.slots.appendleft(self.new_slot(snake[1]))
+        elif len(snake) > 1:
+            slot = self.slots.pop()
+            self.write(slot, snake[1])
+            self.slots.appendleft(slot)
+        self.flush()
+
+    def flush(self):
+        for chunk in self.dirty:
+            vertices = self.chunks[chunk]
+            quads = len(vertices) // FLOATS_PER_QUAD
+            mesh = self.meshes[chunk]
+            mesh.vertices = vertices
+            if quads != self.quads[chunk]:
+                mesh.indices = QUAD_INDICES[:quads * 6]
+                self.quads[chunk] = quads
+        self.dirty.clear()
+
+
+# Таблица для bytes.translate: любое ненулевое число сегментов -> 1
+NONZERO = bytes([0] + [1] * 255)
+
+
+class SnakeViewportRenderer:
+    """Рисует только видимую часть тела на полях больше экрана.
+
+    Пространственный индекс сегментов - сетка занятости движка
+    (engine.occupied): видимые сегменты находятся просмотром клеток окна
+    камеры, поэтому работа за кадр зависит от размера экрана, а не от
+    длины змейки или размера поля. Видимые сегменты - квады в Mesh,
+    сетки добавляются, только если окно не помещается в одну.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.group = None
+        self.window = None
+        self.tick = None
+
+    def build(self, group):
+        self.group = group
+        self.meshes = []
+        self.quads = []
+        self.window = None
+        self.update(self.game.visible_cells())
+
+    def update(self, window):
+        # window - (x0, y0, x1, y1) в клетках, правая и верхняя границы не входят
+        engine = self.game.engine
+        if window == self.window and engine.ticks == self.tick:
+            return
+        self.window = window
+        self.tick = engine.ticks
+        x0, y0, x1, y1 = window
+        cols = engine.cols
+        occupied = engine.occupied
+        vertices = []
+        extend = vertices.extend
+        for y in range(y0, y1):
+            start = y * cols
+            row = occupied[start + x0:start + x1].translate(NONZERO)
+            x = row.find(1)
+            while x >= 0:
+                cx = x0 + x
+                extend((cx, y, 0, 0, cx + 1, y, 1, 0,
+                        cx + 1, y + 1, 1, 1, cx, y + 1, 0, 1))
+                x = row.find(1, x + 1)
+
+        per_mesh = QUADS_PER_MESH * FLOATS_PER_QUAD
+        chunks = max(1, -(-len(vertices) // per_mesh))
+        while len(self.meshes) < chunks:
+            mesh = Mesh(mode='triangles')
+            self.group.add(mesh)
+            self.meshes.append(mesh)
+            self.quads.append(0)
+        for chunk, mesh in enumerate(self.meshes):
+            part = vertices[chunk * per_mesh:(chunk + 1) * per_mesh]
+            quads = len(part) // FLOATS_PER_QUAD
+            mesh.vertices = part
+            if quads != self.quads[chunk]:
+                mesh.indices = QUAD_INDICES[:quads * 6]
+                self.quads[chunk] = quads
+
+
+class ArenaRenderer:
+    """Еда и головы ботов арены: по одному Mesh на слой.
+
+    За тик просматривается только еда и головы (O(число змеек)), тела
+    всех змеек рисует SnakeViewportRenderer по общей сетке занятости.
+    """
+
+    LAYERS = (
+        ('food', (1, 0, 0, 1)),
+        ('special', (1, 0.5, 0, 1)),  # Оранжевый
+        ('heads', (0.3, 0.6, 1, 1)),
+    )
+
+    def __init__(self, game):
+        self.game = game
+        self.window = None
+        self.tick = None
+
+    def build(self, group):
+        self.meshes = {}
+        self.quads = {}
+        for name, rgba in self.LAYERS:
+            group.add(Color(*rgba))
+            self.meshes[name] = Mesh(mode='triangles')
+            self.quads[name] = 0
+            group.add(self.meshes[name])
+        self.window = None
+        self.update(self.game.visible_cells())
+
+    def update(self, window):
+        engine = self.game.engine
+        if window == self.window and engine.ticks == self.tick:
+            return
+        self.window = window
+        self.tick = engine.ticks
+        x0, y0, x1, y1 = window
+        cols = engine.cols
+        layers = {name: [] for name, _ in self.LAYERS}
+        cells = [(('food' if engine.food_kind[i] == FOOD else 'special'), i)
+                 for i in engine.food_cells]
+        cells += [('heads', bot.snake.head()) for bot in engine.bots() if bot.alive]
+        for name, i in cells:
+            y, x = divmod(i, cols)
+            if x0 <= x < x1 and y0 <= y < y1:
+                layers[name].extend((x, y, 0, 0, x + 1, y, 1, 0,
+                                     x + 1, y + 1, 1, 1, x, y + 1, 0, 1))
+        for name, vertices in layers.items():
+            # Квадов в слое не больше, чем змеек и еды, - одной сетки хватает
+            vertices = vertices[:QUADS_PER_MESH * FLOATS_PER_QUAD]
+            quads = len(vertices) // FLOATS_PER_QUAD
+            mesh = self.meshes[name]
+            mesh.vertices = vertices
+            if quads != self.quads[name]:
+                mesh.indices = QUAD_INDICES[:quads * 6]
+                self.quads[name] = quads
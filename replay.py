@@ -0,0 +1,151 @@
+import struct
+
+from engine import SnakeEngine, DIRECTIONS
+
+# Формат записи:
+#   b'SNKR', версия (1 байт), tick (double), varint: seed, cols, rows,
+#   start_x, start_y, код направления, число событий, события,
+#   всего тиков, итоговый счет.
+# Событие - одно varint: (тиков с прошлого события << 2) | код направления.
+MAGIC = b'SNKR'
+VERSION = 1
+
+
+def write_varint(buf, value):
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """Запись игры: сид, настройки и тики, на которых менялось направление."""
+
+    def __init__(self, seed, cols, rows, tick, start, direction,
+                 events=None, ticks=0, score=0):
+        self.seed = seed
+        self.cols = cols
+        self.rows = rows
+        self.tick = tick
+        self.start = start
+        self.direction = direction
+        self.events = events if events is not None else []  # (тик, направление)
+        self.ticks = ticks
+        self.score = score
+
+    def to_bytes(self):
+        buf = bytearray(MAGIC)
+        buf.append(VERSION)
+        buf += struct.pack('<d', self.tick)
+        for value in (self.seed, self.cols, self.rows, self.start[0], self.start[1],
+                      DIRECTIONS.index(self.direction), len(self.events)):
+            write_varint(buf, value)
+        last_tick = 0
+        for tick, direction in self.events:
+            write_varint(buf, (tick - last_tick) << 2 | DIRECTIONS.index(direction))
+            last_tick = tick
+        write_varint(buf, self.ticks)
+        write_varint(buf, self.score)
+        return bytes(buf)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if data[:4] != MAGIC or data[4] != VERSION:
+            raise ValueError('Неизвестный формат записи')
+        tick, = struct.unpack_from('<d', data, 5)
+        pos = 13
+        values = []
+        for _ in range(7):
+            value, pos = read_varint(data, pos)
+            values.append(value)
+        seed, cols, rows, start_x, start_y, code, count = values
+        events = []
+        last_tick = 0
+        for _ in range(count):
+            value, pos = read_varint(data, pos)
+            last_tick += value >> 2
+            events.append((last_tick, DIRECTIONS[value & 3]))
+        ticks, pos = read_varint(data, pos)
+        score, pos = read_varint(data, pos)
+        return cls(seed, cols, rows, tick, (start_x, start_y), DIRECTIONS[code],
+                   events, ticks, score)
+
+    def new_engine(self, **kwargs):
+        engine = SnakeEngine(self.cols, self.rows, tick=self.tick, seed=self.seed, **kwargs)
+        if engine.snake[0] != self.start or engine.direction != self.direction:
+            engine.reset(start=self.start, direction=self.direction, seed=self.seed)
+        return engine
+
+
+class ReplayRecorder:
+    """Пишет направление перед каждым тиком, если оно изменилось."""
+
+    def __init__(self, engine):
+        self.replay = Replay(engine.seed, engine.cols, engine.rows, engine.tick,
+                             engine.snake[0], engine.direction)
+        self.last_direction = engine.direction
+
+    def record(self, engine):
+        # Вызывается перед engine.step()
+        if engine.direction != self.last_direction:
+            self.replay.events.append((engine.ticks, engine.direction))
+            self.last_direction = engine.direction
+
+    def finish(self, engine):
+        self.replay.ticks = engine.ticks
+        self.replay.score = engine.score
+        return self.replay
+
+
+class ReplayCursor:
+    """Выдает направления из записи по номеру тика."""
+
+    def __init__(self, replay):
+        self.events = replay.events
+        self.index = 0
+
+    def apply(self, engine):
+        # Вызывается перед engine.step(); направление ставится без проверки
+        # разворота - в записи уже то, что действовало в игре
+        events = self.events
+        while self.index < len(events) and events[self.index][0] <= engine.ticks:
+            engine.direction = events[self.index][1]
+            self.index += 1
+
+
+def play(replay, **kwargs):
+    """Быстрая проверка записи без окна: возвращает движок после последнего тика."""
+    engine = replay.new_engine(**kwargs)
+    cursor = ReplayCursor(replay)
+    while not engine.game_over and engine.ticks < replay.ticks:
+        cursor.apply(engine)
+        engine.step()
+    return engine
+
+
+def verify(replay):
+    # Совпадают ли счет и длина игры с записанными
+    engine = play(replay)
+    return engine.ticks == replay.ticks and engine.score == replay.score
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        return Replay.from_bytes(f.read())
+
+
+def save(replay, path):
+    with open(path, 'wb') as f:
+        f.write(replay.to_bytes())
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+
+from arena import ArenaEngine
+from engine import DIRECTIONS, DEFAULT_TICK, SPECIAL
+from inputs import InputQueue
+
+# Протокол - строки JSON в обе стороны.
+#   клиент: {"join": "комната"}, затем {"dir": индекс в DIRECTIONS}
+#   сервер: {"id": свой id, "cols", "rows", "tick"} и полный снимок
+#     {"t": тик, "full": 1, "s": [[id, [клетки от головы], направление]...],
+#      "f": [[клетка, вид]...],
+#      "sc": [[id, счет, множитель, секунд неуязвимости]...]},
+#   дальше каждый тик дельта {"t": тик, "m": [[id, голова, выросла]...],
+#     "s": появившиеся змейки, "x": [исчезнувшие id], "f": новая еда, "e": съеденная,
+#     "sc": изменившиеся счета}.
+# Клетки - индексы y * cols + x; вид еды: 0 - обычная, 1 - специальная.
+ROOM_COLS = 38
+ROOM_ROWS = 28
+ROOM_BOTS = 8
+# Сколько байт может ждать отправки клиенту; медленный клиент отключается
+WRITE_LIMIT = 256 * 1024
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode()
+
+
+class Room:
+    """Комната: авторитетная арена и подключенные к ней игроки.
+
+    Правила ведет только сервер. Клиенты присылают направления, а каждый
+    тик получают одну и ту же дельту: новые головы, выросла ли змейка,
+    появившиеся и исчезнувшие змейки и изменения еды. Дельта кодируется
+    один раз на комнату. Повороты игроков копятся в InputQueue, и на тике
+    каждая змейка берет не больше одного, как при игре на устройстве.
+    """
+
+    def __init__(self, name, cols=ROOM_COLS, rows=ROOM_ROWS, bots=ROOM_BOTS,
+                 tick=DEFAULT_TICK, seed=None):
+        self.name = name
+        self.engine = ArenaEngine(cols, rows, bots=bots, tick=tick, seed=seed)
+        # Без "главного" игрока: первая змейка комнаты - тоже бот
+        self.engine.player.bot = True
+        self.clients = {}  # id змейки -> StreamWriter
+        self.inputs = {}  # id змейки -> InputQueue поворотов игрока
+        self.remember()
+
+    def remember(self):
+        # Состояние на конец тика, от которого считается следующая дельта
+        self.bodies = {snake.id: (snake.snake, len(snake.snake))
+                       for snake in self.engine.snakes if snake.alive}
+        self.foods = set(self.engine.food_cells)
+        self.scores = {snake.id: self.score_of(snake) for snake in self.engine.snakes}
+
+    def score_of(self, snake):
+        # Время неуязвимости передается только при ее начале, дальше клиент считает сам
+        return (snake.score, snake.score_multiplier, snake.invincible)
+
+    def score_item(self, snake):
+        timer = round(snake.invincible_timer, 3) if snake.invincible else 0
+        return [snake.id, snake.score, snake.score_multiplier, timer]
+
+    def body_item(self, snake):
+        return [snake.id, list(snake.snake.indices()), DIRECTIONS.index(snake.direction)]
+
+    def food_list(self, cells):
+        kinds = self.engine.food_kind
+        return [[i, int(kinds[i] == SPECIAL)] for i in cells]
+
+    def snapshot(self):
+        engine = self.engine
+        return {
+            't': engine.ticks,
+            'full': 1,
+            's': [self.body_item(snake) for snake in engine.snakes if snake.alive],
+            'f': self.food_list(engine.food_cells),
+            'sc': [self.score_item(snake) for snake in engine.snakes],
+        }
+
+    def join(self, writer):
+        engine = self.engine
+        snake = engine.add_snake(bot=False)
+        if not snake.alive:
+            engine.remove_snake(snake)
+            return None
+        writer.write(encode({'id': snake.id, 'cols': engine.cols, 'rows': engine.rows,
+                             'tick': engine.tick}))
+        # Новая змейка войдет в дельту следующего тика - в снимке ее еще нет
+        message = self.snapshot()
+        message['s'] = [item for item in message['s'] if item[0] in self.bodies]
+        writer.write(encode(message))
+        self.clients[snake.id] = writer
+        self.inputs[snake.id] = InputQueue()
+        return snake
+
+    def leave(self, snake):
+        self.clients.pop(snake.id, None)
+        self.inputs.pop(snake.id, None)
+        if snake in self.engine.snakes:
+            self.engine.remove_snake(snake)
+
+    def turn(self, snake, direction):
+        # Поворот применится на ближайшем тике (step)
+        inputs = self.inputs.get(snake.id)
+        if inputs is not None:
+            inputs.push(direction, time.perf_counter(), snake.direction)
+
+    def delta(self):
+        engine = self.engine
+        moved = []
+        spawned = []
+        alive = set()
+        for snake in engine.snakes:
+            if not snake.alive:
+                continue
+            alive.add(snake.id)
+            old = self.bodies.get(snake.id)
+            body = snake.snake
+            if old is None or old[0] is not body:
+                spawned.append(self.body_item(snake))
+            else:
+                moved.append([snake.id, body.head(), len(body) - old[1]])
+        foods = set(engine.food_cells)
+        scores = []
+        for snake in engine.snakes:
+            if self.scores.get(snake.id) != self.score_of(snake):
+                scores.append(self.score_item(snake))
+        message = {'t': engine.ticks, 'm': moved}
+        gone = [i for i in self.bodies if i not in alive]
+        for key, value in (('s', spawned), ('x', gone), ('f', self.food_list(foods - self.foods)),
+                           ('e', list(self.foods - foods)), ('sc', scores)):
+            if value:
+                message[key] = value
+        return message
+
+    def step(self):
+        engine = self.engine
+        # Каждый поворот сверяется с направлением, с которым змейка реально
+        # ходила, поэтому два поворота за тик не разворачивают ее в себя
+        for snake in engine.snakes:
+            inputs = self.inputs.get(snake.id)
+            if inputs:
+                pressed = inputs.take(snake.direction)
+                if pressed:
+                    snake.turn(pressed[0])
+        engine.step()
+        data = encode(self.delta())
+        # Погибшие игроки убираются с поля; соединение закрывает клиент
+        for snake in engine.snakes[1:]:
+            if not snake.bot and not snake.alive:
+                engine.remove_snake(snake)
+                self.inputs.pop(snake.id, None)
+        self.remember()
+        for snake_id, writer in list(self.clients.items()):
+            if writer.transport.get_write_buffer_size() > WRITE_LIMIT:
+                self.clients.pop(snake_id)
+                writer.close()
+            else:
+                writer.write(data)
+        return len(data)
+
+
+class GameServer:
+    """Сервер комнат: все комнаты тикают в одном цикле asyncio.
+
+    Тики идут по расписанию от времени старта, поэтому задержка одного
+    тика не сдвигает следующие. Комната создается первым вошедшим и
+    удаляется, когда из нее выходит последний игрок.
+    """
+
+    def __init__(self, tick=DEFAULT_TICK, cols=ROOM_COLS, rows=ROOM_ROWS, bots=ROOM_BOTS,
+                 seed=None):
+        self.tick = tick
+        self.cols = cols
+        self.rows = rows
+        self.bots = bots
+        self.seed = seed
+        self.rooms = {}
+        self.tick_times = deque(maxlen=1000)  # длительность тика всех комнат
+        self.sent = 0  # байт дельт, отправленных всем клиентам
+
+    def room(self, name):
+        if name not in self.rooms:
+            self.rooms[name] = Room(name, self.cols, self.rows, self.bots, self.tick, self.seed)
+        return self.rooms[name]
+
+    async def handle(self, reader, writer):
+        room = None
+        snake = None
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                # Сообщения другого вида пропускаются, соединение остается
+                if not isinstance(message, dict):
+                    continue
+                if 'join' in message and room is None:
+                    room = self.room(str(message['join']))
+                    snake = room.join(writer)
+                    if snake is None:
+                        writer.write(encode({'error': 'комната заполнена'}))
+                        break
+                elif 'dir' in message and snake is not None:
+                    code = message['dir']
+                    if type(code) is int and 0 <= code < len(DIRECTIONS):
+                        room.turn(snake, DIRECTIONS[code])
+        except (ConnectionError, ValueError):
+            # ValueError - слишком длинная строка от клиента
+            pass
+        finally:
+            if room:
+                if snake:
+                    room.leave(snake)
+                if not room.clients and self.rooms.get(room.name) is room:
+                    del self.rooms[room.name]
+            writer.close()
+
+    def step(self):
+        started = time.perf_counter()
+        for room in list(self.rooms.values()):
+            self.sent += room.step() * len(room.clients)
+        self.tick_times.append(time.perf_counter() - started)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += self.tick
+            await asyncio.sleep(max(0, deadline - loop.time()))
+            self.step()
+
+    async def serve(self, host='0.0.0.0', port=7777):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Сервер сетевой игры')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--tick', type=float, default=DEFAULT_TICK)
+    parser.add_argument('--cols', type=int, default=ROOM_COLS)
+    parser.add_argument('--rows', type=int, default=ROOM_ROWS)
+    parser.add_argument('--bots', type=int, default=ROOM_BOTS)
+    args = parser.parse_args(argv)
+    server = GameServer(args.tick, args.cols, args.rows, args.bots)
+    print(f'Сервер: {args.host}:{args.port}')
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
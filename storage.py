@@ -0,0 +1,91 @@
+import json
+import os
+import threading
+import time
+
+# Сколько ждать после первой записи, собирая следующие в одну, секунд
+WRITE_DELAY = 0.2
+
+
+def write_atomic(path, data):
+    # Временный файл рядом с целевым и замена одним rename: при падении
+    # посреди записи остается старый файл целиком
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, path)
+
+
+class Storage:
+    """Сохранение файлов в фоновом потоке.
+
+    save() только кладет данные в очередь и сразу возвращается, поэтому
+    игра не ждет диска. Поток пишет файлы через write_atomic; если файл
+    меняется несколько раз, пока предыдущая запись не ушла, на диск
+    попадает только последняя версия.
+    """
+
+    def __init__(self, directory='.', delay=WRITE_DELAY):
+        self.directory = directory
+        self.delay = delay
+        self.pending = {}  # имя файла -> байты
+        self.writing = False
+        self.writes = 0  # сколько файлов записано
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def load_json(self, name, default=None):
+        # Еще не записанная версия важнее той, что на диске
+        with self.condition:
+            data = self.pending.get(name)
+        try:
+            if data is None:
+                with open(self.path(name), 'rb') as f:
+                    data = f.read()
+            return json.loads(data)
+        except (OSError, ValueError):
+            return default
+
+    def save(self, name, data):
+        with self.condition:
+            self.pending[name] = data
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def save_json(self, name, value):
+        self.save(name, json.dumps(value).encode())
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+            # Пауза собирает частые изменения (например, ползунок) в одну запись
+            if self.delay:
+                time.sleep(self.delay)
+            with self.condition:
+                batch, self.pending = self.pending, {}
+                self.writing = True
+            for name, data in batch.items():
+                try:
+                    write_atomic(self.path(name), data)
+                    self.writes += 1
+                except OSError:
+                    pass
+            with self.condition:
+                self.writing = False
+                self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        # Ждет, пока все отложенное окажется на диске (при выходе из игры)
+        with self.condition:
+            self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.pending and not self.writing,
+                                           timeout)
@@ -1,8 +1,10 @@
 import unittest
+import io
 import os
 import tempfile
 import json
 from unittest.mock import Mock, patch, mock_open
+from contextlib import redirect_stdout
 import sys
 
 sys.modules['kivy'] = Mock()
@@ -19,8 +21,27 @@ sys.modules['kivy.properties'] = Mock()
 sys.modules['kivy.core.audio'] = Mock()
 
 import random
+import socket
+import threading
 import warnings
 warnings.filterwarnings('ignore')
+
+import batch
+import bench
+import engine
+from arena import ArenaEngine
+import client
+from client import RemoteArena
+from autopilot import Autopilot
+import profiler
+import replay
+import server
+import assets
+import mixer
+from inputs import InputQueue
+import storage
+from engine import SnakeEngine
+import vecenv
 class MockWidget:
     def __init__(self, **kwargs):
         self.pos = (0, 0)
@@ -119,6 +140,688 @@ class TestSnakeGame(unittest.TestCase):
         self.assertEqual(self.game.score_multiplier, 2)
 
 
+class TestSnakeEngine(unittest.TestCase):
+    """Тестирование игрового движка без Kivy"""
+    def setUp(self):
+        self.engine = SnakeEngine(10, 10, seed=1)
+        self.engine.special_food = None
+        self.engine.food = (9, 9)
+
+    def test_step_moves_head(self):
+        """Тест движения головы на одну клетку"""
+        event = self.engine.step()
+        self.assertEqual(event, engine.MOVE)
+        self.assertEqual(list(self.engine.snake), [(5, 4)])
+
+    def test_reverse_turn_ignored(self):
+        """Тест запрета разворота на 180 градусов"""
+        self.assertFalse(self.engine.turn((-1, 0)))
+        self.assertTrue(self.engine.turn((0, 1)))
+        self.assertEqual(self.engine.direction, (0, 1))
+
+    def test_wall_collision(self):
+        """Тест столкновения со стеной"""
+        self.engine.set_snake([(9, 4)])
+        self.assertEqual(self.engine.step(), engine.DEATH)
+        self.assertTrue(self.engine.game_over)
+
+    def test_self_collision(self):
+        """Тест столкновения с собой"""
+        self.engine.set_snake([(4, 4), (4, 5), (5, 5), (5, 4), (5, 3)])
+        self.assertEqual(self.engine.step(), engine.DEATH)
+
+    def test_eat_food_grows(self):
+        """Тест роста змейки после еды"""
+        self.engine.food = (5, 4)
+        self.assertEqual(self.engine.step(), engine.FOOD)
+        self.assertEqual(self.engine.score, 1)
+        self.assertEqual(len(self.engine.snake), 2)
+        self.assertNotIn(self.engine.food, self.engine.snake)
+
+    def test_special_food_effects(self):
+        """Тест эффектов специальной еды"""
+        self.engine.special_food = (5, 4)
+        self.engine.special_food_timer = 10
+        self.assertEqual(self.engine.step(), engine.SPECIAL)
+        self.assertEqual(self.engine.score, 5)
+        self.assertTrue(self.engine.invincible)
+        self.assertEqual(self.engine.score_multiplier, 2)
+        # Неуязвимая змейка проходит сквозь стену
+        self.engine.set_snake([(9, 4)])
+        self.assertEqual(self.engine.step(), engine.MOVE)
+        self.assertEqual(self.engine.snake[0], (0, 4))
+
+    def test_occupancy_follows_snake(self):
+        """Тест обновления сетки занятости при движении"""
+        self.engine.set_snake([(4, 4), (3, 4), (2, 4)])
+        self.engine.step()
+        self.assertTrue(self.engine.is_occupied((5, 4)))
+        self.assertFalse(self.engine.is_occupied((2, 4)))
+        self.assertEqual(sum(self.engine.occupied), 3)
+
+    def test_free_cells_match_occupancy(self):
+        """Тест согласованности индекса свободных клеток"""
+        moves = random.Random(2)
+        for _ in range(50):
+            if self.engine.step(moves.choice(engine.DIRECTIONS)) == engine.DEATH:
+                break
+        free = sorted(self.engine.free_cells)
+        expected = [i for i, count in enumerate(self.engine.occupied) if not count]
+        self.assertEqual(free, expected)
+        for pos, i in enumerate(self.engine.free_cells):
+            self.assertEqual(self.engine.free_pos[i], pos)
+
+    def test_rebuild_keeps_free_cells_sorted(self):
+        """Тест: после set_snake свободные клетки идут по возрастанию"""
+        self.engine.set_snake([(4, 4), (3, 4), (3, 5), (0, 0)])
+        expected = [i for i, count in enumerate(self.engine.occupied) if not count]
+        self.assertEqual(list(self.engine.free_cells), expected)
+        for pos, i in enumerate(expected):
+            self.assertEqual(self.engine.free_pos[i], pos)
+        self.assertEqual(self.engine.free_pos[0], -1)
+
+    def test_full_board_ends_round(self):
+        """Тест завершения раунда при заполненном поле"""
+        small = SnakeEngine(2, 1, seed=1)
+        small.set_snake([(0, 0)])
+        small.direction = (1, 0)
+        small.food = (1, 0)
+        self.assertEqual(small.step(), engine.WIN)
+        self.assertTrue(small.game_over)
+        self.assertTrue(small.won)
+        self.assertIsNone(small.food)
+
+    def test_same_seed_same_food(self):
+        """Тест воспроизводимости игры по сиду"""
+        def play(**kwargs):
+            game = SnakeEngine(30, 20, seed=42, **kwargs)
+            foods = []
+            for _ in range(200):
+                # Ходим змейкой по полю, подбирая еду по пути
+                x, y = game.snake[0]
+                if x in (0, game.cols - 1) and game.direction[0]:
+                    game.turn((0, 1) if y < game.rows - 1 else (0, -1))
+                elif game.direction[1]:
+                    game.turn((-1, 0) if x else (1, 0))
+                if game.step() in (engine.FOOD, engine.SPECIAL):
+                    foods.append((game.food, game.special_food))
+            return game.seed, foods
+        seed, foods = play()
+        self.assertEqual(seed, 42)
+        self.assertTrue(foods)
+        self.assertEqual(play(), (seed, foods))
+        self.assertEqual(play(rng_batch=16), (seed, foods))
+
+    def test_body_ring_buffer_grows(self):
+        """Тест кольцевого буфера тела: порядок сегментов при переполнении"""
+        body = engine.SnakeBody(100)
+        for i in range(10):
+            body.push(i)
+        for _ in range(8):
+            body.pop()
+        for i in range(10, 40):
+            body.push(i)
+        self.assertEqual(len(body), 32)
+        self.assertEqual(list(body.indices()), list(range(39, 7, -1)))
+        self.assertEqual(body[0], (39, 0))
+        self.assertEqual(body[-1], (8, 0))
+        with self.assertRaises(IndexError):
+            body[32]
+
+    def test_invincibility_expires(self):
+        """Тест окончания неуязвимости"""
+        self.engine.invincible = True
+        self.engine.invincible_timer = 0.3
+        self.engine.step(dt=0.2)
+        self.assertTrue(self.engine.invincible)
+        self.engine.step(dt=0.2)
+        self.assertFalse(self.engine.invincible)
+
+
+class TestReplay(unittest.TestCase):
+    """Тестирование записи и воспроизведения игр"""
+    def record_game(self):
+        game = SnakeEngine(20, 15, seed=7)
+        recorder = replay.ReplayRecorder(game)
+        moves = random.Random(3)
+        while not game.game_over and game.ticks < 500:
+            # Поворачиваем к еде, изредка - случайно
+            x, y = game.snake[0]
+            fx, fy = game.food
+            if moves.random() < 0.1:
+                game.turn(moves.choice(engine.DIRECTIONS))
+            elif x != fx:
+                game.turn((1 if fx > x else -1, 0))
+            else:
+                game.turn((0, 1 if fy > y else -1))
+            recorder.record(game)
+            game.step()
+        return game, recorder.finish(game)
+
+    def test_varint_roundtrip(self):
+        """Тест кодирования varint"""
+        for value in (0, 1, 127, 128, 300, 2 ** 32):
+            buf = bytearray()
+            replay.write_varint(buf, value)
+            self.assertEqual(replay.read_varint(buf, 0), (value, len(buf)))
+
+    def test_bytes_roundtrip(self):
+        """Тест сохранения записи в байты и обратно"""
+        game, record = self.record_game()
+        data = record.to_bytes()
+        loaded = replay.Replay.from_bytes(data)
+        self.assertEqual(loaded.seed, 7)
+        self.assertEqual((loaded.cols, loaded.rows), (20, 15))
+        self.assertEqual(loaded.events, record.events)
+        self.assertEqual((loaded.ticks, loaded.score), (game.ticks, game.score))
+        # Одно событие занимает один-два байта
+        self.assertLess(len(data), 32 + 2 * len(record.events))
+
+    def test_headless_playback(self):
+        """Тест повторения игры по записи"""
+        game, record = self.record_game()
+        played = replay.play(replay.Replay.from_bytes(record.to_bytes()))
+        self.assertEqual(list(played.snake), list(game.snake))
+        self.assertEqual(played.score, game.score)
+        self.assertTrue(replay.verify(record))
+
+    def test_bad_magic(self):
+        """Тест отказа от чужого формата"""
+        with self.assertRaises(ValueError):
+            replay.Replay.from_bytes(b'NOPE\x01')
+
+
+class TestTickProfiler(unittest.TestCase):
+    """Тестирование профайлера фаз тика"""
+    def test_percentiles(self):
+        """Тест расчета перцентилей"""
+        values = list(range(1, 101))
+        self.assertEqual(profiler.percentile(values, 0.5), 51)
+        self.assertEqual(profiler.percentile(values, 0.99), 100)
+        self.assertEqual(profiler.percentile([], 0.5), 0)
+
+    def test_ring_buffer(self):
+        """Тест ограничения числа записей"""
+        prof = profiler.TickProfiler(size=3)
+        for tick in range(5):
+            prof.begin_tick(tick)
+            prof.add('draw', 0.001)
+            prof.end_tick(instructions=10)
+        self.assertEqual([r['tick'] for r in prof.records], [2, 3, 4])
+        self.assertEqual(prof.records[-1]['instructions'], 10)
+
+    def test_engine_phases(self):
+        """Тест замера фаз внутри движка"""
+        game = SnakeEngine(10, 10, seed=1)
+        game.profiler = profiler.TickProfiler()
+        game.food = (5, 4)
+        game.profiler.begin_tick(0)
+        game.step()
+        game.profiler.end_tick()
+        record = game.profiler.records[0]
+        self.assertGreater(record['collision'], 0)
+        self.assertGreater(record['spawn'], 0)
+
+    def test_export_trace(self):
+        """Тест выгрузки трассы в JSON"""
+        prof = profiler.TickProfiler()
+        prof.begin_tick(1)
+        prof.end_tick()
+        path = os.path.join(tempfile.mkdtemp(), 'trace.json')
+        prof.export_trace(path)
+        with open(path) as f:
+            self.assertEqual(json.load(f)[0]['tick'], 1)
+
+    def test_input_latency(self):
+        """Тест учета задержки ввода"""
+        prof = profiler.TickProfiler()
+        prof.begin_tick(1)
+        prof.add_latency(0.05)
+        prof.end_tick()
+        prof.add_latency(0.15)
+        self.assertEqual(prof.records[0]['input_latency'], 0.05)
+        self.assertEqual(prof.summary()['input'], (0.15, 0.15))
+
+
+class TestAutopilot(unittest.TestCase):
+    """Тестирование автопилота"""
+    def test_autopilot_eats_and_survives(self):
+        """Тест: автопилот собирает еду и не врезается"""
+        game = SnakeEngine(16, 12, seed=3)
+        pilot = Autopilot()
+        while not game.game_over and game.ticks < 1000:
+            game.step(pilot.choose(game))
+        self.assertGreater(game.score, 10)
+        self.assertTrue(not game.game_over or game.won)
+
+    def test_autopilot_avoids_walls_and_body(self):
+        """Тест: автопилот не выбирает занятую клетку или разворот"""
+        game = SnakeEngine(10, 10, seed=1)
+        game.set_snake([(9, 5), (8, 5), (8, 6), (9, 6)])
+        game.direction = (1, 0)
+        game.food = (0, 0)
+        self.assertEqual(Autopilot().choose(game), (0, -1))
+
+    def test_search_is_spread_over_ticks(self):
+        """Тест: поиск от еды продолжается на следующих тиках"""
+        game = SnakeEngine(200, 200, seed=1)
+        game.food = (199, 199)
+        pilot = Autopilot()
+        pilot.choose(game)
+        self.assertTrue(pilot.searching())
+        for _ in range(20):
+            pilot.choose(game)
+        head_x, head_y = game.snake[0]
+        self.assertGreater(pilot.dist[pilot.index((head_x + 1, head_y), 202)], 0)
+
+
+class TestInputQueue(unittest.TestCase):
+    """Тестирование очереди поворотов"""
+    def test_two_taps_in_one_tick(self):
+        """Тест: два нажатия за тик - два поворота на двух тиках"""
+        game = SnakeEngine(10, 10, seed=1)
+        game.set_snake([(5, 5), (4, 5), (3, 5)])
+        game.direction = (1, 0)
+        inputs = InputQueue()
+        self.assertTrue(inputs.push((0, 1), 1.0, game.direction))
+        self.assertTrue(inputs.push((-1, 0), 1.01, game.direction))
+        direction, when = inputs.take(game.direction)
+        self.assertEqual((direction, when), ((0, 1), 1.0))
+        game.turn(direction)
+        game.step()
+        game.turn(inputs.take(game.direction)[0])
+        self.assertNotEqual(game.step(), engine.DEATH)
+        self.assertEqual(game.snake[0], (4, 6))
+
+    def test_reverse_and_repeat_are_ignored(self):
+        """Тест: разворот и повтор направления в очередь не попадают"""
+        inputs = InputQueue()
+        self.assertFalse(inputs.push((-1, 0), 0, (1, 0)))
+        self.assertFalse(inputs.push((1, 0), 0, (1, 0)))
+        self.assertTrue(inputs.push((0, 1), 0, (1, 0)))
+        self.assertFalse(inputs.push((0, -1), 0, (1, 0)))
+        self.assertEqual(len(inputs), 1)
+
+    def test_queue_is_bounded(self):
+        """Тест: нажатия сверх размера очереди отбрасываются"""
+        inputs = InputQueue(size=2)
+        for direction in ((0, 1), (1, 0), (0, -1)):
+            inputs.push(direction, 0, (-1, 0))
+        self.assertEqual(len(inputs), 2)
+        self.assertEqual(inputs.dropped, 1)
+
+    def test_take_checks_applied_direction(self):
+        """Тест: поворот, ставший разворотом к моменту тика, пропускается"""
+        inputs = InputQueue()
+        inputs.push((0, 1), 0, (1, 0))
+        inputs.push((1, 0), 0, (1, 0))
+        # Направление сменилось не из очереди (например, автопилотом)
+        self.assertEqual(inputs.take((0, -1)), ((1, 0), 0))
+        self.assertIsNone(inputs.take((1, 0)))
+
+
+class TestBatchRunner(unittest.TestCase):
+    """Тестирование пакетного прогона игр"""
+    def options(self, **kwargs):
+        options = vars(batch.parse_args(['--cols', '10', '--rows', '6', '--max-ticks', '2000']))
+        options.update(kwargs)
+        return options
+
+    def test_run_game_is_deterministic(self):
+        """Тест: игра с тем же сидом дает тот же результат"""
+        first = batch.run_game((0, 5, self.options(policy='autopilot')))
+        second = batch.run_game((1, 5, self.options(policy='autopilot')))
+        self.assertEqual(first['score'], second['score'])
+        self.assertEqual(first['ticks'], second['ticks'])
+
+    def test_cycle_policy_wins(self):
+        """Тест: обход по циклу заполняет поле"""
+        result = batch.run_game((0, 1, self.options(policy='cycle')))
+        self.assertTrue(result['won'])
+        self.assertEqual(result['length'], 60)
+
+    def test_rule_overrides(self):
+        """Тест: без особой еды каждая клетка змейки стоит одно очко"""
+        result = batch.run_game((0, 2, self.options(policy='cycle', special_chance=0)))
+        self.assertEqual(result['specials'], 0)
+        self.assertEqual(result['score'], result['length'] - 1)
+
+
+@unittest.skipIf(vecenv.np is None, 'нужен numpy')
+class TestVecSnakeEnv(unittest.TestCase):
+    """Тестирование векторного окружения"""
+    def test_same_rules_as_engine(self):
+        """Тест: при той же еде поля идут так же, как SnakeEngine"""
+        for seed in range(20):
+            game = SnakeEngine(8, 6, seed=seed, special_food_chance=0.5)
+            env = vecenv.VecSnakeEnv(1, 8, 6, seed=seed)
+            rng = random.Random(seed)
+            while True:
+                # Еду берем из движка: генераторы у них разные
+                env.food[0] = game.food[1] * 8 + game.food[0]
+                env.special[0] = -1
+                if game.special_food:
+                    env.special[0] = game.special_food[1] * 8 + game.special_food[0]
+                    env.special_timer[0] = game.special_food_timer
+                action = rng.randrange(4) if rng.random() < 0.3 else -1
+                event = game.step(engine.DIRECTIONS[action] if action >= 0 else None)
+                _, _, done = env.step([action])
+                self.assertEqual(vecenv.EVENTS[env.events[0]], event)
+                if done[0]:
+                    break
+                self.assertEqual(env.score[0], game.score)
+                self.assertEqual(env.length[0], len(game.snake))
+                self.assertEqual(env.invincible[0], game.invincible)
+                self.assertEqual(bytes(env.occupied[0]), bytes(game.occupied))
+
+    def test_reverse_is_ignored(self):
+        """Тест: разворот на 180 градусов не выполняется"""
+        env = vecenv.VecSnakeEnv(2, 10, 10, seed=1)
+        env.set_snake(0, [(5, 5), (4, 5)])
+        env.food[:] = -1
+        env.special[:] = -1
+        env.step([1, 3])
+        self.assertEqual(list(env.heads()), [56, 34])
+
+    def test_finished_env_is_reset(self):
+        """Тест: после смерти поле начинается заново"""
+        env = vecenv.VecSnakeEnv(2, 6, 6, seed=1)
+        env.set_snake(0, [(5, 0)])
+        env.food[0] = -1
+        env.special[0] = -1
+        (grid, heads, _, _), _, done = env.step([0, 2])
+        self.assertEqual(list(done), [True, False])
+        self.assertEqual(env.events[0], vecenv.EVENTS.index(engine.DEATH))
+        self.assertEqual(heads[0], 4 * 6 + 4)
+        self.assertEqual(env.length[0], 1)
+        self.assertIs(grid.base, env.occupied)
+
+
+class TestArena(unittest.TestCase):
+    """Тестирование арены с ботами"""
+    def setUp(self):
+        self.game = ArenaEngine(10, 10, bots=1, seed=1)
+        self.bot = self.game.bots()[0]
+        for i in list(self.game.food_cells):
+            self.game.remove_food(i)
+
+    def place(self, snake, cells, direction):
+        snake.snake = engine.SnakeBody(self.game.cols, cells)
+        snake.direction = direction
+        self.game.rebuild_occupancy()
+
+    def test_collision_with_other_snake(self):
+        """Тест: игрок погибает, врезавшись в тело бота"""
+        self.place(self.game.player, [(4, 4)], (1, 0))
+        self.place(self.bot, [(5, 3), (5, 4), (5, 5)], (0, 1))
+        self.assertEqual(self.game.step(), engine.DEATH)
+        self.assertTrue(self.game.game_over)
+
+    def test_scores_are_per_snake(self):
+        """Тест: счет и множитель у каждой змейки свои"""
+        self.place(self.game.player, [(4, 4)], (1, 0))
+        self.place(self.bot, [(0, 0)], (1, 0))
+        self.game.add_food(1, engine.SPECIAL)
+        self.assertEqual(self.game.move(self.bot, 0.2), engine.SPECIAL)
+        self.assertEqual(self.bot.score, 5)
+        self.assertEqual(self.bot.score_multiplier, 2)
+        self.assertEqual(self.game.score, 0)
+        self.assertEqual(self.game.score_multiplier, 1)
+        self.assertEqual(len(self.bot.snake), 2)
+
+    def test_dead_bot_leaves_the_board(self):
+        """Тест: тело погибшего бота убирается, бот появляется заново"""
+        self.place(self.game.player, [(4, 4)], (0, 1))
+        self.place(self.bot, [(9, 0), (8, 0), (7, 0)], (1, 0))
+        self.assertEqual(self.game.move(self.bot, 0.2), engine.DEATH)
+        self.assertFalse(any(self.game.is_occupied((x, 0)) for x in (7, 8, 9)))
+        self.game.step()
+        self.assertTrue(self.bot.alive)
+        self.assertEqual(sum(self.game.occupied), 2)
+
+    def test_shared_grid_stays_consistent(self):
+        """Тест: общая сетка занятости совпадает с телами всех змеек"""
+        game = ArenaEngine(30, 20, bots=40, seed=5)
+        for _ in range(300):
+            if game.step() == engine.DEATH:
+                break
+        expected = bytearray(game.cols * game.rows)
+        for body in game.bodies():
+            for i in body.indices():
+                expected[i] += 1
+        self.assertEqual(game.occupied, expected)
+        self.assertEqual(sorted(game.free_cells),
+                         [i for i, count in enumerate(expected) if not count])
+
+
+class FakeWriter:
+    """Писатель потока, который копит строки сервера"""
+    def __init__(self):
+        self.lines = []
+        self.transport = Mock()
+        self.transport.get_write_buffer_size.return_value = 0
+
+    def write(self, data):
+        self.lines.extend(json.loads(line) for line in data.decode().splitlines())
+
+    def close(self):
+        pass
+
+    def take(self):
+        lines, self.lines = self.lines, []
+        return lines
+
+
+class TestServer(unittest.TestCase):
+    """Тестирование сервера комнат и копии арены на клиенте"""
+    def assertMirrors(self, room, arena):
+        bodies = {snake.id: list(snake.snake.indices())
+                  for snake in room.engine.snakes if snake.alive}
+        mirror = {snake_id: list(snake.snake.indices())
+                  for snake_id, snake in arena.snakes.items()}
+        self.assertEqual(mirror, bodies)
+        self.assertEqual(arena.occupied, room.engine.occupied)
+        self.assertEqual(set(arena.food_kind), set(room.engine.food_kind))
+
+    def join(self, room):
+        writer = FakeWriter()
+        snake = room.join(writer)
+        lines = writer.take()
+        arena = RemoteArena(lines[0])
+        arena.apply(lines[1])
+        return snake, writer, arena
+
+    def test_deltas_rebuild_room(self):
+        """Тест: снимок и дельты воспроизводят тела, сетку и еду сервера"""
+        room = server.Room('test', 20, 15, bots=6, seed=3)
+        for _ in range(5):
+            room.step()
+        snake, writer, arena = self.join(room)
+        self.assertEqual(arena.id, snake.id)
+        self.assertNotIn(arena.id, arena.snakes)
+        rng = random.Random(1)
+        for _ in range(300):
+            if rng.random() < 0.3:
+                snake.turn(rng.choice(engine.DIRECTIONS))
+            room.step()
+            messages = writer.take()
+            event = arena.step(messages=messages)
+            self.assertEqual(arena.ticks, room.engine.ticks)
+            if event == engine.DEATH:
+                self.assertNotIn(snake, room.engine.snakes)
+                break
+            self.assertMirrors(room, arena)
+            self.assertEqual(arena.score, snake.score)
+            self.assertEqual(arena.invincible, snake.invincible)
+            self.assertAlmostEqual(arena.invincible_timer,
+                                   snake.invincible_timer if snake.invincible else 0)
+
+    def test_invincibility_timer_matches_server(self):
+        """Тест: неуязвимость на клиенте кончается на том же тике, что на сервере"""
+        room = server.Room('test', 20, 15, bots=0, seed=7)
+        snake, writer, arena = self.join(room)
+        room.step()
+        arena.step(messages=writer.take())
+        x, y = snake.snake[0]
+        snake.direction = (1, 0) if x < room.engine.cols // 2 else (-1, 0)
+        room.engine.add_food((y * room.engine.cols + x + snake.direction[0]), engine.SPECIAL)
+        ticks = int(room.engine.invincible_time / room.engine.tick) + 3
+        for _ in range(ticks):
+            room.step()
+            arena.step(messages=writer.take())
+            self.assertEqual(arena.invincible, snake.invincible)
+            self.assertAlmostEqual(arena.invincible_timer,
+                                   snake.invincible_timer if snake.invincible else 0)
+        self.assertEqual(arena.score, engine.SPECIAL_POINTS)
+        self.assertFalse(arena.invincible)
+
+    def test_two_turns_in_one_tick(self):
+        """Тест: два поворота за тик применяются на двух тиках, без разворота в себя"""
+        room = server.Room('test', 20, 15, bots=0, seed=7)
+        snake, writer, arena = self.join(room)
+        cols = room.engine.cols
+        x, y = snake.snake[0]
+        dx = 1 if x < cols // 2 else -1
+        dy = 1 if y < room.engine.rows // 2 else -1
+        snake.direction = (dx, 0)
+        # Две еды впереди: змейка из трех клеток, шея сразу за головой
+        for step in (1, 2):
+            room.engine.add_food(y * cols + x + dx * step, engine.FOOD)
+            room.step()
+        self.assertEqual(len(snake.snake), 3)
+        room.turn(snake, (0, dy))
+        room.turn(snake, (-dx, 0))
+        room.step()
+        self.assertTrue(snake.alive)
+        self.assertEqual(snake.direction, (0, dy))
+        room.step()
+        self.assertTrue(snake.alive)
+        self.assertEqual(snake.direction, (-dx, 0))
+        self.assertIn(snake, room.engine.snakes)
+
+    def test_leave_removes_snake(self):
+        """Тест: вышедший игрок пропадает у остальных клиентов"""
+        room = server.Room('test', 20, 15, bots=2, seed=4)
+        first, first_writer, first_arena = self.join(room)
+        second, second_writer, _ = self.join(room)
+        room.step()
+        first_arena.step(messages=first_writer.take())
+        self.assertIn(second.id, first_arena.snakes)
+        room.leave(second)
+        room.step()
+        first_arena.step(messages=first_writer.take())
+        self.assertNotIn(second.id, first_arena.snakes)
+        self.assertEqual(set(room.clients), {first.id})
+        self.assertMirrors(room, first_arena)
+
+    def test_delta_is_small(self):
+        """Тест: обычная дельта - только головы змеек, без тел"""
+        room = server.Room('test', 38, 28, bots=8, seed=2)
+        for _ in range(20):
+            room.step()
+        delta = room.delta()
+        self.assertTrue(all(len(item) == 3 for item in delta['m']))
+        self.assertLess(len(server.encode(delta)), 400)
+
+    def test_localhost_round_trip(self):
+        """Тест: клиент входит в комнату через сокет и получает дельты"""
+        async def scenario():
+            game = server.GameServer(seed=5)
+            listener = await server.asyncio.start_server(game.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await server.asyncio.open_connection('127.0.0.1', port)
+            writer.write(server.encode({'join': 'room'}))
+            arena = RemoteArena(json.loads(await reader.readline()))
+            arena.apply(json.loads(await reader.readline()))
+            for _ in range(3):
+                game.step()
+                arena.apply(json.loads(await reader.readline()))
+            self.assertMirrors(game.rooms['room'], arena)
+            writer.close()
+            listener.close()
+            return arena
+        arena = server.asyncio.run(scenario())
+        self.assertEqual(arena.ticks, 3)
+        self.assertIn(arena.id, arena.snakes)
+
+    def serve_in_thread(self, game):
+        # Сервер с тиками в своем потоке, как у настоящего клиента
+        loop = server.asyncio.new_event_loop()
+        listener = loop.run_until_complete(
+            server.asyncio.start_server(game.handle, '127.0.0.1', 0))
+        ticker = loop.create_task(game.run())
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        async def stop():
+            ticker.cancel()
+            listener.close()
+            await listener.wait_closed()
+
+        def shutdown():
+            server.asyncio.run_coroutine_threadsafe(stop(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+        self.addCleanup(shutdown)
+        return listener.sockets[0].getsockname()[1]
+
+    def test_connection_reports_ready_game(self):
+        """Тест: вход в комнату идет в фоне, готовая игра приходит в on_ready"""
+        port = self.serve_in_thread(server.GameServer(tick=0.02, seed=8))
+        ready = threading.Event()
+        games = []
+        connection = client.ArenaConnection(
+            '127.0.0.1', port, 'room',
+            on_ready=lambda game: (games.append(game), ready.set()),
+            on_error=lambda error: ready.set())
+        self.assertTrue(ready.wait(5))
+        self.assertEqual(len(games), 1)
+        game = games[0]
+        self.assertIn(game.id, game.snakes)
+        self.assertIs(game.connection, connection)
+        connection.close()
+        connection.thread.join(5)
+
+    def test_connection_reports_error(self):
+        """Тест: недоступный сервер - on_error, без ожидания в вызывающем потоке"""
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        failed = threading.Event()
+        errors = []
+        client.ArenaConnection('127.0.0.1', port,
+                               on_ready=lambda game: None,
+                               on_error=lambda error: (errors.append(error), failed.set()))
+        self.assertTrue(failed.wait(client.CONNECT_TIMEOUT + 1))
+        self.assertTrue(errors[0])
+
+    def test_bad_messages_are_ignored(self):
+        """Тест: сообщения не того вида пропускаются, игрок остается в комнате"""
+        async def scenario():
+            game = server.GameServer(seed=6)
+            listener = await server.asyncio.start_server(game.handle, '127.0.0.1', 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await server.asyncio.open_connection('127.0.0.1', port)
+            writer.write('"join"\n[1]\nне json\n'.encode())
+            writer.write(server.encode({'join': 'room'}))
+            arena = RemoteArena(json.loads(await reader.readline()))
+            arena.apply(json.loads(await reader.readline()))
+            for code in (1.0, True, 7, -1, 'up', None):
+                writer.write(server.encode({'dir': code}))
+            await server.asyncio.sleep(0.05)
+            game.step()
+            arena.apply(json.loads(await reader.readline()))
+            room = game.rooms.get('room')
+            self.assertIsNotNone(room)
+            self.assertIn(arena.id, room.clients)
+            writer.close()
+            listener.close()
+            return arena
+        arena = server.asyncio.run(scenario())
+        self.assertIn(arena.id, arena.snakes)
+
+
 class TestSettings(unittest.TestCase):
     """Тестирование настроек"""    
     def test_sound_toggle_logic(self):
@@ -186,6 +889,435 @@ class TestHighScoreSystem(unittest.TestCase):
         with patch('os.path.exists', return_value=False):
             high_score = 0  # Значение по умолчанию
             self.assertEqual(high_score, 0)
+class TestStorage(unittest.TestCase):
+    """Тестирование фонового сохранения файлов"""
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.storage = storage.Storage(self.temp_dir, delay=0.05)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_save_is_written_in_background(self):
+        """Тест: save не пишет сам, файл появляется после flush"""
+        self.storage.save_json('high_score.json', {'high_score': 120})
+        self.assertTrue(self.storage.flush(timeout=5))
+        with open(os.path.join(self.temp_dir, 'high_score.json')) as f:
+            self.assertEqual(json.load(f), {'high_score': 120})
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'high_score.json.tmp')))
+
+    def test_writes_are_coalesced(self):
+        """Тест: частые изменения одного файла записываются последней версией"""
+        for value in range(50):
+            self.storage.save_json('settings.json', {'game_speed': value})
+        self.assertTrue(self.storage.flush(timeout=5))
+        self.assertLess(self.storage.writes, 5)
+        self.assertEqual(self.storage.load_json('settings.json'), {'game_speed': 49})
+
+    def test_load_prefers_pending_version(self):
+        """Тест: чтение видит еще не записанную версию"""
+        self.storage.delay = 1
+        self.storage.save_json('high_score.json', {'high_score': 7})
+        self.assertEqual(self.storage.load_json('high_score.json'), {'high_score': 7})
+
+    def test_broken_file_gives_default(self):
+        """Тест: отсутствующий или испорченный файл - значение по умолчанию"""
+        self.assertEqual(self.storage.load_json('missing.json', {}), {})
+        with open(os.path.join(self.temp_dir, 'broken.json'), 'w') as f:
+            f.write('{"high_sc')
+        self.assertEqual(self.storage.load_json('broken.json', {}), {})
+
+    def test_atomic_write_keeps_old_file_on_error(self):
+        """Тест: ошибка записи не портит прежний файл"""
+        path = os.path.join(self.temp_dir, 'high_score.json')
+        storage.write_atomic(path, b'{"high_score": 1}')
+        with patch('os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                storage.write_atomic(path, b'{"high_')
+        with open(path) as f:
+            self.assertEqual(json.load(f), {'high_score': 1})
+
+
+class TestAssets(unittest.TestCase):
+    """Тестирование общего кэша звуков"""
+    def setUp(self):
+        self.loader = Mock()
+        self.loader.load.side_effect = lambda name: Mock(name=name)
+
+    def test_sounds_load_once(self):
+        """Тест: звуки загружаются один раз и отдаются одни и те же"""
+        cache = assets.Assets(self.loader)
+        cache.preload()
+        cache.preload()
+        cache.wait(5)
+        first = cache.sound(assets.EAT_SOUND)
+        self.assertIsNotNone(first)
+        self.assertIs(cache.sound(assets.EAT_SOUND), first)
+        self.assertEqual(len(cache.voices(assets.EAT_SOUND)), assets.VOICES)
+        self.assertEqual(self.loader.load.call_count, len(assets.SOUNDS) * assets.VOICES)
+
+    def test_missing_sound_is_none(self):
+        """Тест: незагруженный или отсутствующий звук - None"""
+        self.loader.load.side_effect = [None, OSError('нет файла')]
+        cache = assets.Assets(self.loader)
+        self.assertIsNone(cache.sound(assets.EAT_SOUND))
+        with patch('builtins.print'):
+            cache.load_sounds(assets.SOUNDS)
+        self.assertIsNone(cache.sound(assets.EAT_SOUND))
+        self.assertIsNone(cache.sound(assets.GAME_OVER_SOUND))
+
+
+class FakeVoice:
+    """Звук, который играет, пока его не остановят"""
+    def __init__(self):
+        self.state = 'stop'
+        self.plays = 0
+
+    def play(self):
+        self.state = 'play'
+        self.plays += 1
+
+
+class TestMixer(unittest.TestCase):
+    """Тестирование пула голосов"""
+    def setUp(self):
+        loader = Mock()
+        loader.load.side_effect = lambda name: FakeVoice()
+        self.assets = assets.Assets(loader, voice_count=3)
+        self.assets.load_sounds(assets.SOUNDS)
+        self.mixer = mixer.Mixer(self.assets, max_voices=4)
+
+    def test_repeated_sound_uses_next_voice(self):
+        """Тест: повтор звука берет другой голос, а не перезапускает первый"""
+        voices = self.assets.voices(assets.EAT_SOUND)
+        self.assertTrue(self.mixer.start_voice(assets.EAT_SOUND))
+        self.assertTrue(self.mixer.start_voice(assets.EAT_SOUND))
+        self.assertEqual([voice.plays for voice in voices], [1, 1, 0])
+        voices[0].state = 'stop'
+        self.assertTrue(self.mixer.start_voice(assets.EAT_SOUND))
+        self.assertTrue(self.mixer.start_voice(assets.EAT_SOUND))
+        self.assertEqual([voice.plays for voice in voices], [2, 1, 1])
+
+    def test_voices_are_limited(self):
+        """Тест: сверх лимита голосов звук пропускается"""
+        for _ in range(3):
+            self.mixer.start_voice(assets.EAT_SOUND)
+        self.assertFalse(self.mixer.start_voice(assets.EAT_SOUND))
+        self.assertTrue(self.mixer.start_voice(assets.GAME_OVER_SOUND))
+        self.assertFalse(self.mixer.start_voice(assets.GAME_OVER_SOUND))
+        self.assertEqual(self.mixer.playing(), 4)
+        self.assertEqual(self.mixer.dropped, 2)
+
+    def test_play_is_queued(self):
+        """Тест: play только ставит звук в очередь, играет фоновый поток"""
+        with patch.object(self.mixer, 'start_voice') as start_voice:
+            self.mixer.play(assets.EAT_SOUND)
+            self.mixer.close()
+        start_voice.assert_called_once_with(assets.EAT_SOUND)
+
+
+class RecordingClock:
+    """Часы Kivy, которые помнят запланированные интервалы"""
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule_interval(self, callback, timeout):
+        self.scheduled.append(callback)
+
+    def schedule_once(self, callback, timeout=0):
+        pass
+
+    def create_trigger(self, callback, timeout=0):
+        return lambda *args: None
+
+    def unschedule(self, callback):
+        self.scheduled = [event for event in self.scheduled if event != callback]
+
+    def get_time(self):
+        return 0
+
+
+class StubKivyTest(unittest.TestCase):
+    """Основа тестов экранов: свежий main на заглушке Kivy и часы RecordingClock"""
+    def setUp(self):
+        # main импортируется заново поверх заглушки; прежние модули вернутся в tearDown
+        names = [name for name in sys.modules
+                 if name == 'kivy' or name.startswith('kivy.')] + ['main', 'render']
+        self.saved_modules = {name: sys.modules.get(name) for name in names}
+        bench.install_stub_kivy()
+        sys.modules.pop('main', None)
+        sys.modules.pop('render', None)
+        import main
+        import render
+        self.main = main
+        self.render = render
+        self.clock = RecordingClock()
+        self.clock_patch = patch.object(main, 'Clock', self.clock)
+        self.clock_patch.start()
+        self.temp_dir = tempfile.mkdtemp()
+        self.app = main.SnakeApp()
+        self.app.storage = storage.Storage(self.temp_dir, delay=0)
+        self.app.sound_enabled = False
+        self.app.root = main.BoxLayout(orientation='vertical')
+        self.app.root.size = (400, 400)
+
+    def tearDown(self):
+        import shutil
+        self.clock_patch.stop()
+        for name, module in self.saved_modules.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def start_game(self):
+        # Игра с известным сидом и шагом, точным в двоичной записи
+        self.app.game_seed = 1
+        self.app.game_speed = 0.25
+        self.app.start_game()
+        return self.app.screen
+
+
+class TestScreenClocks(StubKivyTest):
+    """Тестирование часов экранов на заглушке Kivy"""
+    def test_only_visible_menu_animates(self):
+        """Тест: после обхода экранов запланирована только анимация видимого меню"""
+        for _ in range(3):
+            self.app.show_menu()
+            menu = self.app.screen
+            self.assertEqual(self.clock.scheduled, [menu.animate_title])
+            self.app.show_settings()
+            self.assertEqual(self.clock.scheduled, [])
+            self.app.show_menu()
+            self.assertEqual(self.clock.scheduled, [menu.animate_title])
+            self.app.start_game()
+            game = self.app.screen
+            self.assertEqual(self.clock.scheduled, [game.frame])
+            game.end_game()
+            self.assertEqual(self.clock.scheduled, [])
+        self.app.show_menu()
+        self.assertIs(self.app.screen, menu)
+        self.assertEqual(self.clock.scheduled, [menu.animate_title])
+
+    def test_seed_goes_to_log(self):
+        """Тест: сид игры пишется в лог Kivy, stdout остается чистым"""
+        out = io.StringIO()
+        with patch.object(self.main, 'Logger') as logger, redirect_stdout(out):
+            game = self.start_game()
+        self.assertEqual(out.getvalue(), '')
+        logger.info.assert_called_once()
+        self.assertIn(str(game.engine.seed), logger.info.call_args[0][0])
+
+    def test_pause_unschedules_frame(self):
+        """Тест: на паузе frame снят, после паузы запланирован с нулевым накоплением"""
+        self.app.start_game()
+        game = self.app.screen
+        game.accumulator = 0.15
+        game.set_paused(True)
+        self.assertEqual(self.clock.scheduled, [])
+        game.set_paused(False)
+        self.assertEqual(self.clock.scheduled, [game.frame])
+        self.assertEqual(game.accumulator, 0)
+
+    def test_background_unschedules_frame(self):
+        """Тест: свернутое приложение не тикает, после возврата игра ждет на паузе"""
+        self.app.start_game()
+        game = self.app.screen
+        game.accumulator = 0.15
+        self.assertTrue(self.app.on_pause())
+        self.assertEqual(self.clock.scheduled, [])
+        self.assertTrue(game.paused)
+        self.app.on_resume()
+        self.assertEqual(self.clock.scheduled, [])
+        game.set_paused(False)
+        self.assertEqual(self.clock.scheduled, [game.frame])
+        self.assertEqual(game.accumulator, 0)
+
+    def test_background_stops_menu_animation(self):
+        """Тест: свернутое меню не анимируется, после возврата анимация снова идет"""
+        self.app.show_menu()
+        menu = self.app.screen
+        self.app.on_pause()
+        self.assertEqual(self.clock.scheduled, [])
+        self.app.on_resume()
+        self.assertEqual(self.clock.scheduled, [menu.animate_title])
+
+
+class TestFixedTimestep(StubKivyTest):
+    """Тестирование фиксированного шага логики в SnakeGame.frame"""
+    def setUp(self):
+        super().setUp()
+        self.game = self.start_game()
+        self.steps = []
+        update = self.game.update
+        def record(dt):
+            self.steps.append(dt)
+            update(dt)
+        self.game.update = record
+
+    def test_stall_replays_limited_ticks(self):
+        """Тест: после подвисания догоняется не больше MAX_CATCH_UP_TICKS тиков"""
+        game = self.game
+        game.frame(game.speed * 20)
+        self.assertEqual(self.steps, [game.speed] * self.main.MAX_CATCH_UP_TICKS)
+        self.assertEqual(game.engine.ticks, self.main.MAX_CATCH_UP_TICKS)
+        self.assertEqual(game.accumulator, 0)
+
+    def test_update_gets_fixed_step(self):
+        """Тест: кадры разной длины дают тики ровно по speed"""
+        game = self.game
+        for dt in (0.1, 0.2, 0.05, 0.4, 0.01, 0.3):
+            game.frame(dt)
+        self.assertEqual(self.steps, [game.speed] * 4)
+        self.assertAlmostEqual(game.accumulator, 0.06)
+
+    def test_head_is_interpolated(self):
+        """Тест: голова рисуется между клетками в доле accumulator / speed"""
+        game = self.game
+        game.frame(game.speed * 1.5)
+        self.assertEqual(len(self.steps), 1)
+        (x0, y0), (x1, y1) = game.prev_head, game.engine.snake[0]
+        alpha = game.accumulator / game.speed
+        self.assertEqual(alpha, 0.5)
+        self.assertEqual(game.head_rect.pos, (x0 + (x1 - x0) * alpha, y0 + (y1 - y0) * alpha))
+        game.frame(game.speed * 0.25)
+        self.assertEqual(len(self.steps), 1)
+        self.assertEqual(game.head_rect.pos, (x0 + (x1 - x0) * 0.75, y0 + (y1 - y0) * 0.75))
+
+    def test_no_ticks_while_paused(self):
+        """Тест: на паузе кадр не двигает логику и не копит время"""
+        game = self.game
+        game.paused = True
+        game.frame(game.speed * 3)
+        self.assertEqual(self.steps, [])
+        self.assertEqual(game.accumulator, 0)
+
+
+class TestViewport(StubKivyTest):
+    """Тестирование камеры и отсечения тела на поле больше окна"""
+    def setUp(self):
+        super().setUp()
+        self.app.huge_board = True
+        with patch.object(self.main, 'HUGE_BOARD', (200, 150)):
+            self.game = self.start_game()
+
+    def drawn_cells(self):
+        cells = []
+        for mesh in self.game.body_view.meshes:
+            vertices = getattr(mesh, 'vertices', [])
+            cells.extend((vertices[i], vertices[i + 1]) for i in range(0, len(vertices), 16))
+        return cells
+
+    def test_camera_is_clamped(self):
+        """Тест: у края поля камера не выходит за поле"""
+        game = self.game
+        half_w = game.width / 2 / game.cell_size
+        half_h = game.height / 2 / game.cell_size
+        self.assertIsNotNone(game.body_view)
+        self.assertEqual(game.camera, (half_w, half_h))
+        game.follow(199, 149)
+        self.assertEqual(game.camera, (200 - half_w, 150 - half_h))
+        game.follow(100, 0)
+        self.assertEqual(game.camera, (100.5, half_h))
+        x0, y0, x1, y1 = game.visible_cells()
+        self.assertEqual(y0, 0)
+        self.assertLess(x1 - x0, 200)
+
+    def test_only_visible_segments_are_drawn(self):
+        """Тест: квады есть только у сегментов внутри visible_cells"""
+        game = self.game
+        body = [(x, 40) for x in range(120, 20, -1)]
+        game.engine.set_snake(body)
+        game.follow(*body[0])
+        window = game.visible_cells()
+        game.body_view.update(window)
+        x0, y0, x1, y1 = window
+        visible = [(x, y) for x, y in body if x0 <= x < x1 and y0 <= y < y1]
+        self.assertTrue(0 < len(visible) < len(body))
+        self.assertEqual(sorted(self.drawn_cells()), sorted(visible))
+
+    def test_mesh_is_kept_without_changes(self):
+        """Тест: без сдвига окна и без тика сетка не пересобирается"""
+        game = self.game
+        view = game.body_view
+        window = game.visible_cells()
+        view.update(window)
+        vertices = [mesh.vertices for mesh in view.meshes]
+        game.layout_field()
+        view.update(window)
+        self.assertEqual(len(view.meshes), len(vertices))
+        for mesh, old in zip(view.meshes, vertices):
+            self.assertIs(mesh.vertices, old)
+        game.engine.step()
+        view.update(window)
+        self.assertIsNot(view.meshes[0].vertices, vertices[0])
+
+
+class TestBodyRenderers(StubKivyTest):
+    """Тестирование пошаговой отрисовки тела: прямоугольники и Mesh"""
+    def start_snake(self):
+        # Змейка из трех клеток идет вправо, еда - через две клетки от головы
+        game = self.start_game()
+        engine = game.engine
+        engine.set_snake([(5, 4), (4, 4), (3, 4)])
+        engine.direction = (1, 0)
+        engine.food = (8, 4)
+        engine.special_food = None
+        game.body_rects = None
+        game.draw_snake()
+        return game
+
+    def test_tail_rect_moves_to_neck(self):
+        """Тест: на ходе прямоугольник хвоста переезжает на шею, на еде добавляется"""
+        game = self.start_snake()
+        snake = game.engine.snake
+        events = set()
+        for _ in range(5):
+            length = len(snake)
+            children = len(game.body_group.children)
+            tail = game.body_rects[-1]
+            game.update(game.speed)
+            self.assertEqual(len(game.body_rects), len(snake) - 1)
+            self.assertEqual([rect.pos for rect in game.body_rects], list(snake)[1:])
+            if len(snake) == length:
+                events.add('move')
+                self.assertIs(game.body_rects[0], tail)
+                self.assertEqual(len(game.body_group.children), children)
+            else:
+                events.add('food')
+                self.assertEqual(len(game.body_group.children), children + 1)
+        self.assertEqual(events, {'move', 'food'})
+
+    def test_mesh_slots_are_recycled(self):
+        """Тест: в Mesh слот хвоста переезжает на шею, новый слот - только на еде"""
+        self.app.batched_render = True
+        game = self.start_snake()
+        renderer = game.body_mesh
+        self.assertIsNotNone(renderer)
+        snake = game.engine.snake
+        events = set()
+        for _ in range(5):
+            slots = list(renderer.slots)
+            game.update(game.speed)
+            if len(snake) - 1 == len(slots):
+                events.add('move')
+                self.assertEqual(list(renderer.slots), [slots[-1]] + slots[:-1])
+            else:
+                events.add('food')
+                self.assertEqual(list(renderer.slots), [len(slots)] + slots)
+            cells = []
+            for slot in renderer.slots:
+                chunk, local = divmod(slot, self.render.QUADS_PER_MESH)
+                vertices = renderer.meshes[chunk].vertices
+                offset = local * self.render.FLOATS_PER_QUAD
+                cells.append((vertices[offset], vertices[offset + 1]))
+            self.assertEqual(cells, list(snake)[1:])
+            self.assertEqual(len(game.body_group.children), 1)
+        self.assertEqual(events, {'move', 'food'})
+
+
 class TestGameMechanics(unittest.TestCase):
     """Тестирование игровых механик"""
     
@@ -291,6 +1423,20 @@ class TestPerformance(unittest.TestCase):
         self.assertLess(execution_time, 0.1,
                        f"Симуляция слишком медленная: {execution_time:.3f} сек")
     
+    def test_benchmark_cycle_is_safe(self):
+        """Тест цикла бенчмарка: змейка обходит все поле без столкновений"""
+        cells = engine.cycle_cells(6, 4, 25)
+        self.assertEqual(len(set(cells[:24])), 24)
+        self.assertEqual(cells[24], cells[0])
+
+    def test_benchmark_engine_and_spawn(self):
+        """Тест коротких прогонов бенчмарка движка и создания еды"""
+        rows = bench.bench_engine((1, 500), 200)
+        self.assertEqual([row['length'] for row in rows], [1, 500])
+        self.assertTrue(all(row['ticks_per_sec'] > 0 for row in rows))
+        rows = bench.bench_spawn((0, 0.99), 100, side=20)
+        self.assertTrue(all(row['usec_per_call'] > 0 for row in rows))
+
     def test_memory_usage_simulation(self):
         """Тест использования памяти (симуляция)"""
         import sys        
@@ -309,8 +1455,24 @@ def run_all_tests():
     # Создаем тестовый набор
     test_cases = [
         TestSnakeGame,
+        TestSnakeEngine,
+        TestReplay,
+        TestTickProfiler,
+        TestAutopilot,
+        TestInputQueue,
+        TestBatchRunner,
+        TestVecSnakeEnv,
+        TestArena,
+        TestServer,
         TestSettings,
         TestHighScoreSystem,
+        TestStorage,
+        TestAssets,
+        TestMixer,
+        TestScreenClocks,
+        TestFixedTimestep,
+        TestViewport,
+        TestBodyRenderers,
         TestGameMechanics,
         TestAttendanceAnalyzerIntegration,
         TestPerformance
@@ -0,0 +1,219 @@
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для обучения, игре он не нужен
+    np = None
+
+from engine import (DIRECTIONS, DEFAULT_START, DEFAULT_TICK, FOOD_POINTS, SPECIAL_POINTS,
+                    SPECIAL_FOOD_CHANCE, SPECIAL_FOOD_TIME, INVINCIBLE_TIME,
+                    INVINCIBLE_MULTIPLIER, MOVE, FOOD, SPECIAL, DEATH, WIN)
+
+# Коды событий в VecSnakeEnv.events - индексы в этом кортеже
+EVENTS = (MOVE, FOOD, SPECIAL, DEATH, WIN)
+# Обратное направление для каждого индекса в DIRECTIONS
+REVERSE = (1, 0, 3, 2)
+
+
+class VecSnakeEnv:
+    """N независимых полей змейки, которые делают шаг одновременно.
+
+    Правила те же, что у SnakeEngine: обычная и специальная еда,
+    неуязвимость с проходом сквозь стены и множитель очков. Состояние
+    всех полей лежит в массивах numpy, а шаг - это несколько операций
+    над целыми массивами без цикла по полям:
+
+    occupied - число сегментов в каждой клетке, uint8 (n, cols * rows);
+    body - кольцевой буфер клеток змейки, голова в body[i, head_pos[i]];
+    food, special - индексы клеток еды (-1 - еды нет).
+
+    Действие - индекс направления в DIRECTIONS, -1 - не поворачивать.
+    Законченные поля сразу начинаются заново, в events остается
+    событие последнего шага. step() возвращает наблюдения без
+    копирования (grid - вид на occupied), поэтому их нужно скопировать,
+    если они нужны после следующего шага.
+    """
+
+    def __init__(self, n, cols, rows, tick=DEFAULT_TICK, seed=None,
+                 special_food_chance=SPECIAL_FOOD_CHANCE,
+                 special_food_time=SPECIAL_FOOD_TIME,
+                 invincible_time=INVINCIBLE_TIME, start=DEFAULT_START):
+        if np is None:
+            raise RuntimeError('Для VecSnakeEnv нужен numpy')
+        self.n = n
+        self.cols = cols
+        self.rows = rows
+        self.cells = cols * rows
+        self.tick = tick
+        self.special_food_chance = special_food_chance
+        self.special_food_time = special_food_time
+        self.invincible_time = invincible_time
+        self.start = min(start[1], rows - 1) * cols + min(start[0], cols - 1)
+        self.rng = np.random.default_rng(seed)
+
+        self.occupied = np.zeros((n, self.cells), dtype=np.uint8)
+        self.grid = self.occupied.reshape(n, rows, cols)
+        # Неуязвимая змейка может наползать на себя, поэтому длина может
+        # превысить число клеток; буфер при необходимости растет
+        self.body = np.zeros((n, self.cells + 1), dtype=np.int32)
+        self.head_pos = np.zeros(n, dtype=np.int64)
+        self.length = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.food = np.zeros(n, dtype=np.int64)
+        self.special = np.zeros(n, dtype=np.int64)
+        self.special_timer = np.zeros(n)
+        self.invincible = np.zeros(n, dtype=bool)
+        self.invincible_timer = np.zeros(n)
+        self.multiplier = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.events = np.zeros(n, dtype=np.int8)
+        self.rows_index = np.arange(n)
+        self.dx = np.array([d[0] for d in DIRECTIONS], dtype=np.int64)
+        self.dy = np.array([d[1] for d in DIRECTIONS], dtype=np.int64)
+        self.reverse = np.array(REVERSE, dtype=np.int8)
+        self.reset()
+
+    def observe(self):
+        return self.grid, self.heads(), self.food, self.special
+
+    def heads(self):
+        return self.body[self.rows_index, self.head_pos]
+
+    def reset(self, envs=None):
+        if envs is None:
+            envs = self.rows_index
+        self.occupied[envs] = 0
+        self.occupied[envs, self.start] = 1
+        self.body[envs, 0] = self.start
+        self.head_pos[envs] = 0
+        self.length[envs] = 1
+        self.direction[envs] = 0
+        self.special[envs] = -1
+        self.special_timer[envs] = 0
+        self.invincible[envs] = False
+        self.invincible_timer[envs] = 0
+        self.multiplier[envs] = 1
+        self.score[envs] = 0
+        self.ticks[envs] = 0
+        self.spawn(envs)
+        return self.observe()
+
+    def set_snake(self, env, cells, direction=(1, 0)):
+        # Голова - первый элемент, как в SnakeEngine.set_snake
+        cols = self.cols
+        self.occupied[env] = 0
+        for x, y in cells:
+            self.occupied[env, y * cols + x] += 1
+        count = len(cells)
+        if count > self.body.shape[1]:
+            self.grow_body(count)
+        self.body[env, :count] = [y * cols + x for x, y in reversed(cells)]
+        self.head_pos[env] = count - 1
+        self.length[env] = count
+        self.direction[env] = DIRECTIONS.index(direction)
+
+    def grow_body(self, need):
+        # Перекладываем змейки так, чтобы хвост был в начале буфера
+        capacity = max(need, 2 * self.body.shape[1])
+        old = self.body
+        size = old.shape[1]
+        offsets = (self.head_pos - self.length + 1)[:, None] + np.arange(size)
+        self.body = np.zeros((self.n, capacity), dtype=np.int32)
+        self.body[:, :size] = np.take_along_axis(old, offsets % size, axis=1)
+        self.head_pos = self.length - 1
+
+    def pick_free(self, free, counts):
+        # Для каждой строки free - случайная клетка среди True
+        picks = (self.rng.random(len(counts)) * counts).astype(np.int64)
+        return (np.cumsum(free, axis=1) > picks[:, None]).argmax(axis=1)
+
+    def spawn(self, envs):
+        # Новая еда на полях envs; возвращает маску полей, где места нет
+        free = self.occupied[envs] == 0
+        counts = free.sum(axis=1)
+        full = counts == 0
+        food = self.pick_free(free, counts)
+        self.food[envs] = np.where(full, -1, food)
+
+        lucky = (self.rng.random(len(envs)) < self.special_food_chance) & (counts > 1)
+        if lucky.any():
+            chosen = envs[lucky]
+            free = free[lucky]
+            free[np.arange(len(chosen)), food[lucky]] = False
+            self.special[chosen] = self.pick_free(free, counts[lucky] - 1)
+            self.special_timer[chosen] = self.special_food_time
+        return full
+
+    def step(self, actions, dt=None):
+        if dt is None:
+            dt = self.tick
+        rows = self.rows_index
+        cols = self.cols
+        actions = np.asarray(actions)
+        keep = (actions < 0) | (actions == self.reverse[self.direction])
+        self.direction = np.where(keep, self.direction, actions).astype(np.int8)
+        self.ticks += 1
+
+        # Таймеры
+        has_special = self.special >= 0
+        self.special_timer[has_special] -= dt
+        self.special[has_special & (self.special_timer <= 0)] = -1
+        self.invincible_timer[self.invincible] -= dt
+        self.invincible &= self.invincible_timer > 0
+
+        # Новая голова; неуязвимая змейка проходит сквозь стены
+        head = self.body[rows, self.head_pos]
+        x = head % cols + self.dx[self.direction]
+        y = head // cols + self.dy[self.direction]
+        invincible = self.invincible
+        x = np.where(invincible, x % cols, x)
+        y = np.where(invincible, y % self.rows, y)
+        outside = (x < 0) | (x >= cols) | (y < 0) | (y >= self.rows)
+        new_head = np.where(outside, 0, y * cols + x)
+        dead = ~invincible & (outside | (self.occupied[rows, new_head] > 0))
+        alive = ~dead
+
+        moving = rows[alive]
+        new_head = new_head[alive]
+        self.occupied[moving, new_head] += 1
+        self.head_pos[moving] += 1
+        if self.head_pos.max() >= self.body.shape[1]:
+            self.head_pos %= self.body.shape[1]
+        self.body[moving, self.head_pos[moving]] = new_head
+
+        # Еда
+        ate = new_head == self.food[moving]
+        special = ~ate & (new_head == self.special[moving])
+        fed = moving[ate]
+        boosted = moving[special]
+        reward = np.zeros(self.n, dtype=np.int64)
+        reward[fed] = FOOD_POINTS * self.multiplier[fed]
+        reward[boosted] = SPECIAL_POINTS * self.multiplier[boosted]
+        self.score += reward
+        self.invincible[boosted] = True
+        self.invincible_timer[boosted] = self.invincible_time
+        self.multiplier[boosted] = INVINCIBLE_MULTIPLIER
+        self.special[boosted] = -1
+
+        # Хвост уходит, если змейка ничего не съела
+        moved = moving[~ate & ~special]
+        tail = self.body[moved, (self.head_pos[moved] - self.length[moved]) % self.body.shape[1]]
+        self.occupied[moved, tail] -= 1
+        grown = moving[ate | special]
+        self.length[grown] += 1
+        if len(grown) and self.length.max() >= self.body.shape[1]:
+            self.grow_body(self.length.max() + 1)
+
+        won = np.zeros(self.n, dtype=bool)
+        if len(fed):
+            won[fed] = self.spawn(fed)
+
+        events = self.events
+        events[:] = EVENTS.index(MOVE)
+        events[fed] = EVENTS.index(FOOD)
+        events[boosted] = EVENTS.index(SPECIAL)
+        events[dead] = EVENTS.index(DEATH)
+        events[won] = EVENTS.index(WIN)
+        done = dead | won
+        if done.any():
+            self.reset(rows[done])
+        return self.observe(), reward, done